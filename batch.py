@@ -0,0 +1,257 @@
+"""Plays many headless games in parallel to tune levels and ball parameters.
+
+Every game is played by an autopilot paddle that follows the most urgent ball, with a seeded launch angle and aim
+offset, until the level is cleared or max_frames is reached. A ball falling past the paddle counts as a loss and is
+launched again from the paddle. The games are spread over a ProcessPoolExecutor and the results are aggregated per
+parameter set.
+
+run using
+
+    uv run batch.py --games 200 --lvl lvl1.txt --ball-speed 0.4,0.5 --reflect-max-rotate 10,15,20
+"""
+
+# headless must be imported before constants
+from headless import FIXED_DT
+
+# isort: split
+import os
+import random
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import product
+from time import perf_counter, process_time
+
+import numpy as np
+import pygame as pg
+
+import globals
+from constants import (
+    BALL_START_SPEED,
+    BALL_VEL_ANGLE_LIMIT,
+    GAME_FIELD_HEIGHT,
+    PADDLE_REFLECT_MAX_ROTATE,
+    States,
+)
+from entities import Ball, BrickStore, Paddle
+from levels import LevelManager
+from main import Game
+from rewind import RewindBuffer
+
+AUTOPILOT_DEADZONE: int = 4  # pix the paddle may be off its target before it moves
+
+
+@dataclass(frozen=True)
+class BallParams:
+    speed: float = BALL_START_SPEED  # pix/ms
+    reflect_max_rotate: float = PADDLE_REFLECT_MAX_ROTATE  # degrees
+    vel_angle_limit: float = BALL_VEL_ANGLE_LIMIT  # degrees
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    lvl_id: str
+    seed: int
+    max_frames: int
+    params: BallParams = field(default_factory=BallParams)
+    dt: float = FIXED_DT
+
+
+@dataclass
+class GameResult:
+    job: BatchJob
+    cleared: bool
+    frames: int  # frames played, the frames to clear the level if cleared
+    bounces: int  # paddle bounces
+    score: int
+    ball_losses: int
+    cpu_time: float  # s spent by the worker on the game
+
+
+class Autopilot:
+    """Tracks the most urgent ball with the paddle by sending the same key events a player would.
+
+    The most urgent ball is the lowest one falling, or the lowest one if none is falling. The paddle aims a seeded
+    offset away from its center so the bounces do not all leave at the same angle.
+    """
+
+    def __init__(self, paddle: Paddle, rng: random.Random) -> None:
+        self.paddle: Paddle = paddle
+        self.rng: random.Random = rng
+        self.held: int | None = None
+        self.aim: float = 0  # pix from the paddle center
+
+    def retarget(self) -> None:
+        self.aim = self.rng.uniform(-0.4, 0.4) * self.paddle.rect.width
+
+    def events(self, balls: list[Ball]) -> list[pg.Event]:
+        if not balls:
+            return self.press(None)
+
+        falling = [ball for ball in balls if ball.vel.y > 0]
+        target = max(falling or balls, key=lambda ball: ball.rect.bottom)
+        error = target.rect.centerx - (self.paddle.rect.centerx + self.aim)
+        if error > AUTOPILOT_DEADZONE:
+            return self.press(pg.K_RIGHT)
+        if error < -AUTOPILOT_DEADZONE:
+            return self.press(pg.K_LEFT)
+        return self.press(None)
+
+    def press(self, key: int | None) -> list[pg.Event]:
+        if key == self.held:
+            return []
+        events = []
+        if self.held is not None:
+            events.append(pg.Event(pg.KEYUP, key=self.held))
+        if key is not None:
+            events.append(pg.Event(pg.KEYDOWN, key=key))
+        self.held = key
+        return events
+
+
+def launch(ball: Ball, paddle: Paddle, params: BallParams, rng: random.Random) -> None:
+    """Puts ball on top of the paddle, going up within 60 degrees of vertical"""
+    ball.rect.midbottom = paddle.rect.midtop
+    ball.prev_pos.update(ball.rect.topleft)
+    ball.speed = params.speed
+    ball.reflect_max_rotate = params.reflect_max_rotate
+    ball.vel_angle_limit = params.vel_angle_limit
+    ball.vel = pg.Vector2(0, -1).rotate(rng.uniform(-60, 60)) * params.speed
+
+
+def is_paddle_bounce(ball: Ball, vel_y_before: float, paddle: Paddle) -> bool:
+    return vel_y_before > 0 and ball.vel.y < 0 and ball.rect.bottom >= paddle.rect.top - 2
+
+
+def play(job: BatchJob) -> GameResult:
+    result, _ = play_game(job)
+    return result
+
+
+def play_game(job: BatchJob) -> tuple[GameResult, BrickStore]:
+    """Plays a game of job
+
+    Returns:
+        tuple[GameResult, BrickStore]: The result and the brick store of the level played, as it was at the end.
+    """
+    t_start = process_time()
+    rng = random.Random(job.seed)
+    # Batch games end with their level and never go back in time, skip the next level, the prefetch thread and the
+    # rewind history
+    game = Game(
+        job.lvl_id,
+        levels=LevelManager([job.lvl_id], background=False),
+        rewind=RewindBuffer(enabled=False),
+        advance_levels=False,
+    )
+    try:
+        brick_store = game.brick_store
+        for ball in game.balls:
+            launch(ball, game.paddle, job.params, rng)
+
+        autopilot = Autopilot(game.paddle, rng)
+        autopilot.retarget()
+        bounces = ball_losses = 0
+
+        frame = 0
+        while frame < job.max_frames and game.state == States.GAME_RUNNING:
+            vels_y = [ball.vel.y for ball in game.balls]
+            game.game_loop_logic(job.dt, autopilot.events(game.balls))
+            frame += 1
+
+            if not game.bricks:
+                result = GameResult(job, True, frame, bounces, globals.score, ball_losses, process_time() - t_start)
+                return result, brick_store
+
+            for ball, vel_y_before in zip(game.balls, vels_y):
+                if is_paddle_bounce(ball, vel_y_before, game.paddle):
+                    bounces += 1
+                    autopilot.retarget()
+                elif ball.rect.top > GAME_FIELD_HEIGHT:
+                    ball_losses += 1
+                    launch(ball, game.paddle, job.params, rng)
+
+        result = GameResult(job, False, frame, bounces, globals.score, ball_losses, process_time() - t_start)
+        return result, brick_store
+    finally:
+        game.levels.shutdown()
+
+
+def run_batch(jobs: list[BatchJob], workers: int | None = None) -> tuple[list[GameResult], float]:
+    """Plays jobs over a process pool
+
+    Returns:
+        tuple[list[GameResult], float]: The results in the order of jobs and the wall time in s.
+    """
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker, few enough to keep the pickling overhead low, enough to balance the load
+    chunksize = max(1, len(jobs) // (4 * workers))
+
+    t_start = perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(play, jobs, chunksize=chunksize))
+    return results, perf_counter() - t_start
+
+
+def summarize(results: list[GameResult]) -> dict[str, float]:
+    cleared = [r.frames for r in results if r.cleared]
+    return {
+        "games": len(results),
+        "clear_rate": len(cleared) / len(results),
+        "frames_to_clear_p50": float(np.median(cleared)) if cleared else float("nan"),
+        "frames_to_clear_mean": float(np.mean(cleared)) if cleared else float("nan"),
+        "bounces_mean": float(np.mean([r.bounces for r in results])),
+        "score_mean": float(np.mean([r.score for r in results])),
+        "ball_losses_mean": float(np.mean([r.ball_losses for r in results])),
+    }
+
+
+def parse_floats(text: str) -> list[float]:
+    return [float(value) for value in text.split(",")]
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Play many headless games with an autopilot paddle")
+    parser.add_argument("--games", type=int, default=100, help="games per level and parameter set")
+    parser.add_argument("--lvl", action="append", help="map in assets/maps, can be repeated, defaults to lvl1.txt")
+    parser.add_argument("--frames", type=int, default=60 * 60 * 10, help="frames a game may take to clear the level")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, the others count up from it")
+    parser.add_argument("--ball-speed", type=parse_floats, default=[BALL_START_SPEED], help="pix/ms, comma separated")
+    parser.add_argument("--reflect-max-rotate", type=parse_floats, default=[PADDLE_REFLECT_MAX_ROTATE])
+    parser.add_argument("--vel-angle-limit", type=parse_floats, default=[BALL_VEL_ANGLE_LIMIT])
+    args = parser.parse_args()
+
+    all_params = [
+        BallParams(speed, rotate, limit)
+        for speed, rotate, limit in product(args.ball_speed, args.reflect_max_rotate, args.vel_angle_limit)
+    ]
+    jobs = [
+        BatchJob(lvl_id, args.seed + i, args.frames, params)
+        for lvl_id in args.lvl or ["lvl1.txt"]
+        for params in all_params
+        for i in range(args.games)
+    ]
+
+    results, t_wall = run_batch(jobs, args.workers)
+
+    groups: dict[tuple[str, BallParams], list[GameResult]] = {}
+    for result in results:
+        groups.setdefault((result.job.lvl_id, result.job.params), []).append(result)
+    for (lvl_id, params), group in groups.items():
+        summary = summarize(group)
+        print(f"{lvl_id} {asdict(params)}")
+        print("    " + ", ".join(f"{name} {value:.4g}" for name, value in summary.items()))
+
+    frames = sum(r.frames for r in results)
+    cpu_time = sum(r.cpu_time for r in results)
+    per_core = frames / cpu_time
+    print(
+        f"{len(results)} games, {frames} frames in {t_wall:.2f} s on {args.workers} workers: "
+        f"{frames / t_wall:.0f} frames/s, {per_core:.0f} frames/s per core, "
+        f"{frames / t_wall / (per_core * args.workers):.0%} of linear scaling"
+    )
+
+
+if __name__ == "__main__":
+    main()
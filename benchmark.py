@@ -0,0 +1,162 @@
+"""Deterministic frame time benchmark over the shipped maps.
+
+Every map is played headless with a fixed dt, fixed ball seeds and a scripted paddle, once per ball count. The time
+spent in Game.game_loop_logic and Game.game_loop_render (into the off-screen SCREEN) is measured per frame and the
+p50/p95/p99 percentiles are reported in ms.
+
+run using
+
+    uv run benchmark.py --out bench.json
+    uv run benchmark.py --baseline bench.json
+"""
+
+# headless must be imported before constants
+from headless import FIXED_DT
+
+# isort: split
+import json
+import platform
+import random
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pygame as pg
+
+from constants import COLORS, GAME_FIELD_SURFACE, SCREEN
+from levels import LevelManager
+from main import Game
+
+BENCH_MAPS: list[str] = ["lvl1.txt", "lessthan3.txt"]
+BENCH_NUM_BALLS: list[int] = [1, 10, 100]
+BENCH_PERCENTILES: list[int] = [50, 95, 99]
+
+# Paddle script, (frame in period, event type, key), repeated every PADDLE_SCRIPT_PERIOD frames
+PADDLE_SCRIPT_PERIOD: int = 240
+PADDLE_SCRIPT: list[tuple[int, int, int]] = [
+    (0, pg.KEYDOWN, pg.K_LEFT),
+    (60, pg.KEYUP, pg.K_LEFT),
+    (90, pg.KEYDOWN, pg.K_RIGHT),
+    (210, pg.KEYUP, pg.K_RIGHT),
+    (220, pg.KEYDOWN, pg.K_LEFT),
+    (240, pg.KEYUP, pg.K_LEFT),
+]
+
+
+def scripted_paddle_events(frame: int) -> list[pg.Event]:
+    frame_in_period = frame % PADDLE_SCRIPT_PERIOD
+    # The last event of a period lands on the first frame of the next one
+    if frame_in_period == 0 and frame > 0:
+        frame_in_period = PADDLE_SCRIPT_PERIOD
+    return [pg.Event(event_type, key=key) for f, event_type, key in PADDLE_SCRIPT if f == frame_in_period]
+
+
+def create_bench_game(lvl_id: str, num_balls: int, seed: int) -> Game:
+    # No next level is loaded in the background while the frames are timed
+    game = Game(lvl_id, levels=LevelManager([lvl_id], background=False))
+
+    # Replace the default ball with num_balls seeded balls launched upwards within 60 degrees of vertical
+    rng = random.Random(seed)
+    while game.balls:
+        game.remove_entity(game.balls[-1])
+    for _ in range(num_balls):
+        game.ball = game.add_ball(pg.Vector2(0, -1).rotate(rng.uniform(-60, 60)))
+    # The rewind history starts with the balls of the benchmark
+    game.rewind.reset(game)
+
+    return game
+
+
+def percentiles(frame_times: list[float]) -> dict[str, float]:
+    values = np.percentile(np.array(frame_times) * 1e3, BENCH_PERCENTILES)
+    return {f"p{p}": float(v) for p, v in zip(BENCH_PERCENTILES, values)}
+
+
+def bench_case(lvl_id: str, num_balls: int, n_frames: int, dt: float, seed: int) -> dict[str, dict[str, float]]:
+    game = create_bench_game(lvl_id, num_balls, seed)
+
+    logic_times: list[float] = []
+    render_times: list[float] = []
+    try:
+        for frame in range(n_frames):
+            events = scripted_paddle_events(frame)
+
+            t_start = perf_counter()
+            game.game_loop_logic(dt, events)
+            logic_times.append(perf_counter() - t_start)
+
+            SCREEN.fill(COLORS["BLACK"])
+            GAME_FIELD_SURFACE.fill(COLORS["DARK_GREY"])
+
+            t_start = perf_counter()
+            game.game_loop_render()
+            render_times.append(perf_counter() - t_start)
+    finally:
+        game.levels.shutdown()
+
+    return {"logic": percentiles(logic_times), "render": percentiles(render_times)}
+
+
+def run_benchmarks(n_frames: int, dt: float, seed: int) -> dict:
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    for lvl_id in BENCH_MAPS:
+        for num_balls in BENCH_NUM_BALLS:
+            results[f"{lvl_id}/{num_balls}"] = bench_case(lvl_id, num_balls, n_frames, dt, seed)
+
+    return {
+        "meta": {
+            "frames": n_frames,
+            "dt": dt,
+            "seed": seed,
+            "python": platform.python_version(),
+            "pygame": pg.version.ver,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def print_results(bench: dict, baseline: dict | None = None) -> None:
+    header = f"{'case':<20}{'phase':<8}" + "".join(f"{f'p{p} ms':>12}" for p in BENCH_PERCENTILES)
+    if baseline is not None:
+        header += "".join(f"{f'p{p} vs base':>14}" for p in BENCH_PERCENTILES)
+    print(header)
+
+    for case, phases in bench["results"].items():
+        for phase, stats in phases.items():
+            line = f"{case:<20}{phase:<8}" + "".join(f"{stats[f'p{p}']:>12.4f}" for p in BENCH_PERCENTILES)
+            if baseline is not None and case in baseline["results"]:
+                base_stats = baseline["results"][case][phase]
+                line += "".join(
+                    f"{stats[f'p{p}'] / base_stats[f'p{p}']:>13.2f}x" if base_stats[f"p{p}"] > 0 else f"{'-':>14}"
+                    for p in BENCH_PERCENTILES
+                )
+            print(line)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark frame times over the shipped maps")
+    parser.add_argument("--frames", type=int, default=1200, help="frames per case")
+    parser.add_argument("--dt", type=float, default=FIXED_DT, help="fixed frame time in ms")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the ball directions")
+    parser.add_argument("--out", type=Path, help="save the results as json")
+    parser.add_argument("--baseline", type=Path, help="compare against results saved with --out")
+    args = parser.parse_args()
+
+    bench = run_benchmarks(args.frames, args.dt, args.seed)
+
+    baseline = None
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf8"))
+        if baseline["meta"]["frames"] != args.frames or baseline["meta"]["dt"] != args.dt:
+            print("Warning: baseline was run with different frames or dt")
+
+    print_results(bench, baseline)
+
+    if args.out is not None:
+        args.out.write_text(json.dumps(bench, indent=2), encoding="utf8")
+
+
+if __name__ == "__main__":
+    main()
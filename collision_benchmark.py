@@ -0,0 +1,133 @@
+"""Micro-benchmark of the collision step of a ball.
+
+Ball states are sampled from a benchmark game with many balls, only the ones about to collide within a frame are kept.
+Every sample is then replayed against the bricks and colliders of the first frame: the collision search alone
+(Ball.find_next_collisions) and the whole step (Ball.move_and_collide, which also moves, reflects and damages the
+bricks). The bricks are put back after every sample, outside of the measured time. Times are reported per sample in
+us, so per resolved collision.
+
+run using
+
+    uv run collision_benchmark.py --out collisions.json
+    uv run collision_benchmark.py --baseline collisions.json
+"""
+
+# headless must be imported before constants
+from headless import FIXED_DT
+
+# isort: split
+import json
+import platform
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pygame as pg
+
+from benchmark import create_bench_game, scripted_paddle_events
+
+COLLISION_BENCH_BALLS: int = 100
+COLLISION_BENCH_PERCENTILES: list[int] = [50, 95]
+
+
+def sample_ball_states(lvl_id: str, n_frames: int, dt: float, seed: int) -> list[tuple[pg.Rect, pg.Vector2]]:
+    """rect and velocity of every ball before every frame of a benchmark game"""
+    game = create_bench_game(lvl_id, COLLISION_BENCH_BALLS, seed)
+    states: list[tuple[pg.Rect, pg.Vector2]] = []
+    try:
+        for frame in range(n_frames):
+            states.extend((ball.rect.copy(), pg.Vector2(ball.vel)) for ball in game.balls)
+            game.game_loop_logic(dt, scripted_paddle_events(frame))
+    finally:
+        game.levels.shutdown()
+    return states
+
+
+def bench_collisions(lvl_id: str, n_frames: int, dt: float, seed: int, repeat: int) -> dict[str, float]:
+    states = sample_ball_states(lvl_id, n_frames, dt, seed)
+
+    game = create_bench_game(lvl_id, 1, seed)
+    ball, store, others = game.balls[0], game.brick_store, game.ball_colliders
+    saved = store.snapshot()
+    # Only the entities of the first frame are used, the game is never stepped
+    game.levels.shutdown()
+
+    def put(rect: pg.Rect, vel: pg.Vector2) -> None:
+        ball.rect.update(rect)
+        ball.vel.update(vel)
+
+    samples = []
+    for rect, vel in states:
+        put(rect, vel)
+        if ball.find_next_collisions(dt, others, store):
+            samples.append((rect, vel))
+
+    search_times: list[float] = []
+    step_times: list[float] = []
+    for _ in range(repeat):
+        for rect, vel in samples:
+            put(rect, vel)
+            t_start = perf_counter()
+            ball.find_next_collisions(dt, others, store)
+            search_times.append(perf_counter() - t_start)
+
+            put(rect, vel)
+            t_start = perf_counter()
+            ball.move_and_collide(dt, others, store)
+            step_times.append(perf_counter() - t_start)
+            store.restore(saved)
+            for brick in store.bricks:
+                brick.to_be_deleted_flag = False
+
+    results = {"samples": len(samples)}
+    for name, times in (("search", search_times), ("step", step_times)):
+        us = np.array(times) * 1e6
+        results[f"{name}_mean"] = float(us.mean())
+        for p, value in zip(COLLISION_BENCH_PERCENTILES, np.percentile(us, COLLISION_BENCH_PERCENTILES)):
+            results[f"{name}_p{p}"] = float(value)
+    return results
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the collision step of a ball")
+    parser.add_argument("--lvl", default="lvl1.txt", help="map in assets/maps")
+    parser.add_argument("--frames", type=int, default=300, help="frames to sample ball states from")
+    parser.add_argument("--dt", type=float, default=FIXED_DT, help="fixed frame time in ms")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the ball directions")
+    parser.add_argument("--repeat", type=int, default=3, help="times every sample is measured")
+    parser.add_argument("--out", type=Path, help="save the results as json")
+    parser.add_argument("--baseline", type=Path, help="compare against results saved with --out")
+    args = parser.parse_args()
+
+    results = bench_collisions(args.lvl, args.frames, args.dt, args.seed, args.repeat)
+    baseline = None
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf8"))["results"]
+
+    print(f"{args.lvl}: {results['samples']} collisions")
+    for name, value in results.items():
+        if name == "samples":
+            continue
+        line = f"    {name:<12}{value:>10.2f} us"
+        if baseline is not None and baseline.get(name):
+            line += f"{value / baseline[name]:>10.2f}x"
+        print(line)
+
+    if args.out is not None:
+        bench = {
+            "meta": {
+                "lvl": args.lvl,
+                "frames": args.frames,
+                "dt": args.dt,
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "pygame": pg.version.ver,
+            },
+            "results": results,
+        }
+        args.out.write_text(json.dumps(bench, indent=2), encoding="utf8")
+
+
+if __name__ == "__main__":
+    main()
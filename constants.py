@@ -1,20 +1,36 @@
+import os
 from enum import Enum, auto
+from functools import lru_cache
 from pathlib import Path
+
 import pygame as pg
 import pygame.freetype
 
 # Debug flag
 DEBUG: bool = True
 
+# Headless flag, set MEMA_BRICKS_HEADLESS=1 before importing to run without opening a window
+HEADLESS: bool = os.environ.get("MEMA_BRICKS_HEADLESS", "0") == "1"
+
 # Time constants
 FPS: int = 60  # frame per sec
+SIM_TICK_RATE: int = 60  # simulation steps per sec, independent of the frame rate
+SIM_DT: float = 1000 / SIM_TICK_RATE  # ms simulated by one step
+SIM_MAX_STEPS: int = 5  # steps simulated per frame at most, time a slow frame can not catch up on is dropped
+RENDER_INTERPOLATION: bool = True  # draw balls, paddle and trails between the last two simulation steps
 DT_TOL: float = 0.01  # ms tolerance when considering multiple collisions at the same time
+COLLISION_TOL: float = 1.0  # pix overlap still resolved as a collision instead of ignored
 SHOW_FPS: bool = True
+SHOW_PROFILER: bool = True  # per phase frame time graph next to the score
+PROFILER_CSV_PATH: Path | None = None  # stream per frame phase times to this csv file
+REPLAY_RECORD_PATH: Path | None = None  # record the input of every frame to this replay file
 
 # Assets
 ASSETS_PATH = Path(r"assets")
 FONTS_PATH = ASSETS_PATH / "fonts"
 MAPS_PATH = ASSETS_PATH / "maps"
+MAPS_CACHE_PATH = MAPS_PATH / ".cache"  # compiled levels, see level_cache.py
+LEVELS: list[str] = ["lvl1.txt", "lessthan3.txt"]  # maps in the order they are played
 
 # fonts constants
 pygame.freetype.init()
@@ -22,6 +38,19 @@ FONT: pygame.freetype.Font = pygame.freetype.Font(FONTS_PATH / "PixelIntv-OPxd.t
 UI_TEXT_SIZE: int = 25
 PAUSE_TEXT_SIZE: int = 50
 ROW_COL_TEXT_SIZE: int = 10
+TEXT_CACHE_SIZE: int = 64  # rendered strings kept by render_text
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(text: str, color: pg.typing.ColorLike, size: float) -> pg.Surface:
+    """FONT.render cached on (text, color, size), so unchanged HUD strings are not rasterized again.
+
+    color must be hashable, e.g. a tuple from COLORS. The returned surface is shared between callers and must not be
+    drawn on.
+    """
+    surface, _ = FONT.render(text, color, size=size)
+    return surface
+
 
 # Colors
 COLORS: dict[str, pg.typing.ColorLike] = {
@@ -32,17 +61,25 @@ COLORS: dict[str, pg.typing.ColorLike] = {
     "PAUSE_OVERLAY": (0, 0, 0, 200),
     "DEBUG": (255, 0, 0),
     "YELLOW": (255, 255, 0),
+    "COLORKEY": (255, 0, 255),  # transparent color of cached layers
 }
 
+
+class RenderMode(Enum):
+    FULL = auto()  # redraw everything and flip the whole display every frame
+    DIRTY = auto()  # redraw and update only the areas that changed
+
+
 # Screen and geometry
 RENDER_GRID_FLAG: bool = True
+RENDER_MODE: RenderMode = RenderMode.FULL
 
 EDGE_WIDTH = 20
 
 SCREEN_WIDTH: int = 1248
 SCREEN_HEIGHT: int = 800
 SCREEN_SIZE: tuple[int, int] = (SCREEN_WIDTH, SCREEN_HEIGHT)
-SCREEN: pg.Surface = pg.display.set_mode(SCREEN_SIZE, vsync=0)
+SCREEN: pg.Surface = pg.Surface(SCREEN_SIZE) if HEADLESS else pg.display.set_mode(SCREEN_SIZE, vsync=0)
 
 GAME_FIELD_WIDTH: int = SCREEN_HEIGHT
 GAME_FIELD_HEIGHT: int = SCREEN_HEIGHT - EDGE_WIDTH
@@ -81,26 +118,50 @@ class Dir(Enum):
     STATIONARY = auto()
 
 
-def get_vector_dir(reflect_dir: Dir) -> pg.Vector2:
-    match reflect_dir:
-        case Dir.LEFT:
-            return pg.Vector2(1.0, 0.0)
-        case Dir.RIGHT:
-            return pg.Vector2(-1.0, 0.0)
-        case Dir.UP:
-            return pg.Vector2(0.0, 1.0)
-        case Dir.DOWN:
-            return pg.Vector2(0.0, -1.0)
-        case _:
-            return pg.Vector2(0.0, 0.0)
+# Bit of each side in collision side masks
+SIDE_LEFT: int = 1
+SIDE_RIGHT: int = 2
+SIDE_TOP: int = 4
+SIDE_BOTTOM: int = 8
+ALL_SIDES: int = SIDE_LEFT | SIDE_RIGHT | SIDE_TOP | SIDE_BOTTOM
+
+DIR_MASKS: dict[Dir, int] = {
+    Dir.LEFT: SIDE_LEFT,
+    Dir.RIGHT: SIDE_RIGHT,
+    Dir.TOP: SIDE_TOP,
+    Dir.BOTTOM: SIDE_BOTTOM,
+}
+
+# Normal of the surface a ball hits with each of its sides, shared, never modify them
+SIDE_NORMALS: dict[int, pg.Vector2] = {
+    SIDE_LEFT: pg.Vector2(1.0, 0.0),
+    SIDE_RIGHT: pg.Vector2(-1.0, 0.0),
+    SIDE_TOP: pg.Vector2(0.0, 1.0),
+    SIDE_BOTTOM: pg.Vector2(0.0, -1.0),
+}
 
 
 ## Paddle constants
 PADDLE_START_SPEED = 300.0 * 1e-3  # pix/ms
 PADDLE_MIN_SPEED = 150.0 * 1e-3  # pix/ms
 PADDLE_MAX_SPEED = 9999.0 * 1e-3  # pix/ms
+PADDLE_REFLECT_MAX_ROTATE = 15.0  # degrees the bounce normal is rotated by at the ends of the paddle
 
 ## Ball constants
-BALL_START_SPEED = 500.0 * 1e-3  # pix/ms
+BALL_START_SPEED = 400.0 * 1e-3  # pix/ms a new ball moves at
 BALL_MIN_SPEED = 400.0 * 1e-3  # pix/ms
 BALL_MAX_SPEED = 1000.0 * 1e-3  # pix/ms
+BALL_VEL_ANGLE_LIMIT = 60.0  # degrees away from straight up a ball may leave the paddle at
+BALL_MAX_SUBSTEPS = 16  # max collisions resolved per ball per frame
+BALL_TRAIL_CAPACITY = 1024  # max points kept by a ball trail, the oldest are dropped when full
+BALL_TRAIL_TOLERANCE = 1.0  # pix a dropped trail point may be away from the simplified trail
+BALL_TRAIL_FADE = False  # accumulate trails on a fading layer instead of redrawing every point every frame
+BALL_TRAIL_FADE_ALPHA = 4  # alpha removed from the fading trail layer every simulation step
+
+## Rewind constants
+REWIND_KEYFRAME_INTERVAL = 60  # frames between two full copies of the brick state in the rewind history
+REWIND_MEMORY_BUDGET = 4 * 1024 * 1024  # bytes of rewind history kept, the oldest keyframe and its deltas go first
+REWIND_STEP_FRAMES = 2 * SIM_TICK_RATE  # simulation steps rewound by one press of backspace
+
+## Replay constants
+REPLAY_CHECKSUM_INTERVAL = 60  # frames between two world checksums in a replay file
@@ -3,17 +3,20 @@
 
 from .components import (
     Component,
+    ComponentRegistry,
     HealthComponent,
-    on_collision_components_list,
-    on_delete_component_list,
-    on_move_component_list,
-    on_render_component_list,
-    on_update_component_list,
+    Hook,
     ScoreComponent,
     BallTrailComponent,
 )
 from .entity import Entity, MovingEntity
+from .collision import Collision, add_collision, sweep
 from .paddle import Paddle
 from .edge import Edge, LeftEdge, TopEdge, RightEdge
 from .brick import Brick, update_enabled_collision_sides, bricks_dict
+from .brick_grid import BrickGrid
+from .brick_store import BrickStore
+from .brick_layer import BrickLayer
 from .ball import Ball
+from .trail_layer import TrailLayer
+from .entity_store import EntityStore
@@ -3,13 +3,31 @@ from typing import Sequence
 
 import pygame as pg
 
-from constants import DT_TOL, Dir, get_vector_dir
-
-from . import Entity, HealthComponent, MovingEntity, Paddle, ScoreComponent, on_collision_components_list
-
-
-def reflect_rotate(paddle: Paddle, x) -> float:
-    PADDLE_REFLECT_MAX_ROTATE = 15  # degrees
+from constants import (
+    BALL_MAX_SUBSTEPS,
+    BALL_START_SPEED,
+    BALL_VEL_ANGLE_LIMIT,
+    PADDLE_REFLECT_MAX_ROTATE,
+    SIDE_BOTTOM,
+    SIDE_NORMALS,
+)
+
+from . import (
+    Brick,
+    BrickStore,
+    Collision,
+    Entity,
+    Hook,
+    MovingEntity,
+    Paddle,
+    ScoreComponent,
+    sweep,
+)
+
+UP: pg.Vector2 = pg.Vector2(0, -1)
+
+
+def reflect_rotate(paddle: Paddle, x, max_rotate: float = PADDLE_REFLECT_MAX_ROTATE) -> float:
     PADDLE_NEUTRAL_REFLECT_RATIO = 0.00
 
     p_width = paddle.rect.width
@@ -18,7 +36,7 @@ def reflect_rotate(paddle: Paddle, x) -> float:
     xr = x - paddle.rect.centerx
 
     # ax+b=angle
-    a = PADDLE_REFLECT_MAX_ROTATE / p_width_linear
+    a = max_rotate / p_width_linear
     if xr < -p_width_neutral / 2:
         a = a
         b = -a * (-p_width_neutral / 2)  # (+0)
@@ -31,156 +49,106 @@ def reflect_rotate(paddle: Paddle, x) -> float:
     return a * xr + b
 
 
-@dataclass
+@dataclass(slots=True)
 class Ball(MovingEntity):
-    speed: float = 400.0 * 1e-3  # pix/ms
+    speed: float = BALL_START_SPEED  # pix/ms
     max_speed: float = 1000.0 * 1e-3  # pix/ms
     damage: int = 1
+    reflect_max_rotate: float = PADDLE_REFLECT_MAX_ROTATE  # degrees
+    vel_angle_limit: float = BALL_VEL_ANGLE_LIMIT  # degrees
 
     def __post_init__(self) -> None:
+        super(Ball, self).__post_init__()
         self.vel = self.vel.normalize() * self.speed
 
-    @property
-    def move_dir_x(self) -> Dir | None:
-        if self.vel.x < 0:
-            return Dir.LEFT
-        if self.vel.x > 0:
-            return Dir.RIGHT
-        return Dir.STATIONARY
-
-    @property
-    def move_dir_y(self) -> Dir | None:
-        if self.vel.y < 0:
-            return Dir.UP
-        if self.vel.y > 0:
-            return Dir.DOWN
-        return Dir.STATIONARY
-
-    def move_and_collide(self, dt: float, others: Sequence[Entity]) -> None:
+    def move_and_collide(self, dt: float, others: Sequence[Entity], brick_store: BrickStore | None = None) -> None:
         dt_remain = dt
-        while True:
-            collisions = self.find_next_collisions(dt_remain, others)
+        for _ in range(BALL_MAX_SUBSTEPS):
+            collisions = self.find_next_collisions(dt_remain, others, brick_store)
 
             # If no collision happen move and return out
             if not collisions:
                 self.move(dt_remain)
                 return
 
-            min_dt_to_collision = collisions[0][0]
-
+            # Every collision within DT_TOL of the first one is resolved in the same sub-step
             dt_used: float = 0
-            for dt_to_collision, colliding_entity, collide_dir in collisions:
-                # If collision happens within the tolerance of the minimum dt_to_collision calculate the collision
-                if abs(dt_to_collision - min_dt_to_collision) <= DT_TOL:
-                    self.move_and_collide_with(colliding_entity, dt_to_collision - dt_used, collide_dir)
-                    dt_used = dt_to_collision
-                else:  # list is sorted so break after the first time the condition is not true
-                    continue
+            for collision in collisions:
+                self.move_and_collide_with(collision.entity, collision.dt - dt_used, collision.side)
+                dt_used = collision.dt
             dt_remain -= dt_used  # subtract only the used dt after all collisions
 
-    def find_next_collisions(self, dt_remain: float, others: Sequence[Entity]) -> list[tuple[float, Entity, Dir]]:
-        """Returns a list of tuples containing the possible collisions doing dt_remain. The list is sorted after the
-        time to collision
+        # Out of sub-steps: drop the remaining time rather than moving without collision checks
+
+    def find_next_collisions(
+        self, dt_remain: float, others: Sequence[Entity], brick_store: BrickStore | None = None
+    ) -> list[Collision]:
+        """Returns the earliest collisions doing dt_remain, the first one and those within DT_TOL of it, sorted after
+        the time to collision
+
+        The whole motion from the current rect to the moved rect is tested, so a fast ball can not pass through an
+        entity between two frames. Only the earliest collisions are kept while the candidates are tested, see
+        add_collision.
 
         Args:
             dt_remain (float): Remaining time in seconds.
             others (list[Entity]): List of entities to possibly collide with.
+            brick_store (BrickStore | None): Store of bricks to possibly collide with. Only the bricks in the grid
+                cells crossed by the ball up to the earliest collision are tested.
 
         Returns:
-            list[tuple[float, Entity, Dir]]: List of tuples containing the time for the collision, the entity that
-            collides and the direction of the collision
+            list[Collision]: The earliest collisions, empty if there is none doing dt_remain.
         """
+        rect, vel = self.rect, self.vel
+        vx, vy = vel
 
-        moved_rect: pg.Rect = self.rect.copy().move(self.vel * dt_remain)
-        potential_collisions: list[Entity] = [
-            o for o in others if o.enabled_collision_sides and o.rect.colliderect(moved_rect)
-        ]
-
-        collisions: list[tuple[float, Entity, Dir]] = []
-
-        # Find first collision along velocity vector
-        for pc in potential_collisions:
-            # collide left side of self with right side of other
-            if self.move_dir_x == Dir.LEFT and Dir.RIGHT in pc.enabled_collision_sides:
-                pc_dtx = abs((pc.rect.right - self.rect.left) / self.vel.x)
-                pc_collide_dirx = Dir.LEFT
-            # collide right side of self with left side of other
-            elif self.move_dir_x == Dir.RIGHT and Dir.LEFT in pc.enabled_collision_sides:
-                pc_dtx = abs((pc.rect.left - self.rect.right) / self.vel.x)
-                pc_collide_dirx = Dir.RIGHT
-            else:
-                pc_dtx = float("inf")
-                pc_collide_dirx = Dir.STATIONARY
-            x_collision: tuple[float, Entity, Dir] = (pc_dtx, pc, pc_collide_dirx)
-
-            # collide top side of self with bottom side of other
-            if self.move_dir_y == Dir.UP and Dir.DOWN in pc.enabled_collision_sides:
-                pc_dty: float = abs((self.rect.top - pc.rect.bottom) / self.vel.y)
-                pc_collide_diry = Dir.TOP
-            # collide bottom side of self with top side of other
-            elif self.move_dir_y == Dir.DOWN and Dir.UP in pc.enabled_collision_sides:
-                pc_dty: float = abs((self.rect.bottom - pc.rect.top) / self.vel.y)
-                pc_collide_diry = Dir.BOTTOM
-            else:
-                pc_dty = float("inf")
-                pc_collide_diry = Dir.STATIONARY
-            y_collision: tuple[float, Entity, Dir] = (pc_dty, pc, pc_collide_diry)
-
-            if pc_collide_dirx == Dir.STATIONARY and pc_collide_diry == Dir.STATIONARY:
-                continue
-
-            # Test if either is stationary / not turned on
-            if pc_collide_diry == Dir.STATIONARY:
-                if pc_dtx <= dt_remain:
-                    collisions.append(x_collision)
-                continue
-            if pc_collide_dirx == Dir.STATIONARY:
-                if pc_dty <= dt_remain:
-                    collisions.append(y_collision)
-                continue
-
-            # Neither is stationary
-            if abs(pc_dtx - pc_dty) < DT_TOL:
-                # Collisions in x and y happen simultaneously)
-                collisions.append(x_collision)
-                collisions.append(y_collision)
-            elif pc_dtx < pc_dty and pc_dtx <= dt_remain:
-                collisions.append(x_collision)
-            elif pc_dtx > pc_dty and pc_dty <= dt_remain:
-                collisions.append(y_collision)
-
-        return sorted(collisions, key=lambda x: x[0])
-
-    def move_and_collide_with(self, colliding_entity, dt_to_collision, collide_dir) -> None:
+        # Inflated by a pixel since Rect.move truncates the motion
+        swept_rect: pg.Rect = rect.union(rect.move(vx * dt_remain, vy * dt_remain)).inflate(2, 2)
+
+        earliest: list[Collision] = []
+        for other in others:
+            sides = other.enabled_collision_sides
+            other_rect = other.rect
+            if sides and other_rect.colliderect(swept_rect):
+                left, top, right, bottom = other_rect.left, other_rect.top, other_rect.right, other_rect.bottom
+                sweep(rect, vx, vy, dt_remain, left, top, right, bottom, sides, other, earliest)
+
+        if brick_store is not None:
+            brick_store.find_path_collisions(rect, vel, dt_remain, earliest)
+
+        return earliest
+
+    def move_and_collide_with(self, colliding_entity: Entity, dt_to_collision: float, side: int) -> None:
         # Move
         self.move(dt_to_collision)
 
         if isinstance(colliding_entity, Paddle):
-            self.reflect_on_paddle(collide_dir, colliding_entity)
+            self.reflect_on_paddle(side, colliding_entity)
         else:
-            self.reflect(collide_dir)
+            self.reflect(side)
 
-        for component in [c for c in colliding_entity.components if type(c) in on_collision_components_list]:
+        for component in colliding_entity.component_hooks[Hook.COLLISION]:
             match component:
-                case HealthComponent():
-                    colliding_entity.to_be_deleted_flag = component.take_damage(self.damage)
                 case ScoreComponent():
                     component.on_hit()
 
-    def reflect(self, reflect_dir: Dir) -> None:
-        reflect_normal = get_vector_dir(reflect_dir)
+        if isinstance(colliding_entity, Brick):
+            colliding_entity.to_be_deleted_flag = colliding_entity.take_damage(self.damage)
+
+    def reflect(self, side: int) -> None:
+        reflect_normal = SIDE_NORMALS[side]
 
         # only reflect if velocity is opposite normal
         if self.vel.dot(reflect_normal) < 0:
             self.vel.reflect_ip(reflect_normal)
 
-    def reflect_on_paddle(self, reflect_dir: Dir, paddle: Paddle) -> None:
-        angle_change = reflect_rotate(paddle, self.rect.centerx)
+    def reflect_on_paddle(self, side: int, paddle: Paddle) -> None:
+        angle_change = reflect_rotate(paddle, self.rect.centerx, self.reflect_max_rotate)
 
-        if reflect_dir == Dir.BOTTOM:
-            reflect_normal = get_vector_dir(reflect_dir).rotate(angle_change)
+        if side == SIDE_BOTTOM:
+            reflect_normal = SIDE_NORMALS[side].rotate(angle_change)
         else:
-            reflect_normal = get_vector_dir(reflect_dir)
+            reflect_normal = SIDE_NORMALS[side]
 
         # only reflect if velocity is opposite normal
         if self.vel.dot(reflect_normal) < 0:
@@ -189,14 +157,12 @@ class Ball(MovingEntity):
         self.clamp_vel_angle()
 
     def clamp_vel_angle(self) -> None:
-        MINIMUM_VEL_ANGLE = 60
-
-        vel_angle = self.vel.angle_to(pg.Vector2(0, -1))
+        vel_angle = self.vel.angle_to(UP)
 
         if abs(vel_angle) >= 90:
             return
 
-        if vel_angle < -MINIMUM_VEL_ANGLE:
-            self.vel.rotate_ip((vel_angle + MINIMUM_VEL_ANGLE))
-        elif vel_angle > MINIMUM_VEL_ANGLE:
-            self.vel.rotate_ip((vel_angle - MINIMUM_VEL_ANGLE))
+        if vel_angle < -self.vel_angle_limit:
+            self.vel.rotate_ip((vel_angle + self.vel_angle_limit))
+        elif vel_angle > self.vel_angle_limit:
+            self.vel.rotate_ip((vel_angle - self.vel_angle_limit))
@@ -1,21 +1,35 @@
 from abc import ABC
+from collections.abc import Iterable
 from dataclasses import dataclass, field
-from typing import ClassVar, Sequence
+from typing import TYPE_CHECKING, ClassVar, Sequence
 
-import pygame as pg
-
-from constants import GRID_DX, GRID_DY, Dir
+from constants import DIR_MASKS, GRID_DX, GRID_DY, Dir
 from entities.components import ScoreComponent
 
-from . import Entity, HealthComponent
+from . import Entity
+
+if TYPE_CHECKING:
+    from .brick_store import BrickStore
 
 
-@dataclass
+@dataclass(slots=True)
 class Brick(Entity, ABC):
     width: ClassVar[int] = 0
     height: ClassVar[int] = 0
     symbol: ClassVar[str] = "."
+    max_health: ClassVar[int] = 1
     neighbors: list["Brick"] = field(default_factory=lambda: list(), repr=False)
+    store: "BrickStore | None" = field(default=None, repr=False, compare=False)
+    store_id: int = field(default=-1, repr=False)
+
+    @property
+    def health(self) -> int:
+        assert self.store is not None
+        return int(self.store.health[self.store_id])
+
+    def take_damage(self, damage: int) -> bool:
+        assert self.store is not None
+        return self.store.take_damage(self.store_id, damage)
 
     def update_neighbors(self, others: list["Brick"]) -> None:
         self.neighbors = [o for o in others if self.neighbor_is_neighbor(o)]
@@ -25,26 +39,26 @@ class Brick(Entity, ABC):
         return int(cls.width / GRID_DX) - 1
 
 
-@dataclass
+@dataclass(slots=True)
 class BrickSquare(Brick):
     width: ClassVar[int] = GRID_DX
     height: ClassVar[int] = GRID_DY
     symbol: ClassVar[str] = "b"
 
     def __post_init__(self) -> None:
-        self.components.append(HealthComponent(health=1, max_health=1))
-        self.components.append(ScoreComponent(score_death=4, score_hit=1))
+        super(BrickSquare, self).__post_init__()
+        self.add_component(ScoreComponent(score_death=4, score_hit=1))
 
 
-@dataclass
+@dataclass(slots=True)
 class BrickLong(Brick):
     width: ClassVar[int] = 2 * GRID_DX
     height: ClassVar[int] = GRID_DY
     symbol: ClassVar[str] = "B"
 
     def __post_init__(self) -> None:
-        self.components.append(HealthComponent(health=1, max_health=1))
-        self.components.append(ScoreComponent(score_death=8, score_hit=2))
+        super(BrickLong, self).__post_init__()
+        self.add_component(ScoreComponent(score_death=8, score_hit=2))
 
 
 bricks_dict: dict[str, type[Brick] | None] = {
@@ -54,41 +68,42 @@ bricks_dict: dict[str, type[Brick] | None] = {
 }
 
 
-def update_enabled_collision_sides(bricks_to_check: Sequence[Brick], others: Sequence[Entity]):
-    for brick in [b for b in bricks_to_check if not b.to_be_deleted_flag]:
-        brick.enabled_collision_sides = set([Dir.LEFT, Dir.RIGHT, Dir.TOP, Dir.BOTTOM])
-
-        possible_neighbors = [e for e in others if not e.to_be_deleted_flag] + [
-            e for e in brick.neighbors if not e.to_be_deleted_flag
-        ]
-
-        for other in possible_neighbors:
-            if other == brick:
-                continue
-
-            # TODO: Think about this when blocks can be staggered
-            if Dir.LEFT in brick.enabled_collision_sides and (
-                points := other.rect.clipline(brick.neighbor_left_line())
-            ):
-                p1, p2 = (pg.Vector2(points[0]), pg.Vector2(points[1]))
-                if abs(p2.y - p1.y) == brick.rect.height - 1:
-                    brick.enabled_collision_sides.remove(Dir.LEFT)
-
-            if Dir.RIGHT in brick.enabled_collision_sides and (
-                points := other.rect.clipline(brick.neighbor_right_line())
-            ):
-                p1, p2 = (pg.Vector2(points[0]), pg.Vector2(points[1]))
-                if abs(p2.y - p1.y) == brick.rect.height - 1:
-                    brick.enabled_collision_sides.remove(Dir.RIGHT)
-
-            if Dir.TOP in brick.enabled_collision_sides and (points := other.rect.clipline(brick.neighbor_top_line())):
-                p1, p2 = (pg.Vector2(points[0]), pg.Vector2(points[1]))
-                if abs(p2.x - p1.x) == brick.rect.width - 1:
-                    brick.enabled_collision_sides.remove(Dir.TOP)
-
-            if Dir.BOTTOM in brick.enabled_collision_sides and (
-                points := other.rect.clipline(brick.neighbor_bottom_line())
-            ):
-                p1, p2 = (pg.Vector2(points[0]), pg.Vector2(points[1]))
-                if abs(p2.x - p1.x) == brick.rect.width - 1:
-                    brick.enabled_collision_sides.remove(Dir.BOTTOM)
+def side_covered_by(brick: Brick, other: Entity, side: Dir) -> bool:
+    """Whether other covers the whole of side of brick on its own"""
+    # TODO: Think about this when blocks can be staggered
+    match side:
+        case Dir.LEFT:
+            points = other.rect.clipline(brick.neighbor_left_line())
+            return bool(points) and abs(points[1][1] - points[0][1]) == brick.rect.height - 1
+        case Dir.RIGHT:
+            points = other.rect.clipline(brick.neighbor_right_line())
+            return bool(points) and abs(points[1][1] - points[0][1]) == brick.rect.height - 1
+        case Dir.TOP:
+            points = other.rect.clipline(brick.neighbor_top_line())
+            return bool(points) and abs(points[1][0] - points[0][0]) == brick.rect.width - 1
+        case Dir.BOTTOM:
+            points = other.rect.clipline(brick.neighbor_bottom_line())
+            return bool(points) and abs(points[1][0] - points[0][0]) == brick.rect.width - 1
+    return False
+
+
+def update_enabled_collision_sides(bricks_to_check: Iterable[Brick], others: Sequence[Entity]) -> None:
+    """Enables the sides of each brick that are not covered by a single neighboring brick or entity in others.
+
+    Neighboring bricks are looked up in the occupancy grid of the BrickStore, others are only checked for the sides
+    facing out of the grid.
+    """
+    for brick in bricks_to_check:
+        if brick.to_be_deleted_flag:
+            continue
+        assert brick.store is not None
+
+        mask, outside_mask = brick.store.grid.side_masks(brick)
+        if outside_mask:
+            for side, bit in DIR_MASKS.items():
+                if outside_mask & bit and not any(
+                    side_covered_by(brick, other, side) for other in others if not other.to_be_deleted_flag
+                ):
+                    mask |= bit
+
+        brick.store.set_side_mask(brick, mask)
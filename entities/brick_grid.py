@@ -0,0 +1,143 @@
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from math import inf
+
+import pygame as pg
+
+from constants import DIR_MASKS, GAME_FIELD_HEIGHT, GAME_FIELD_WIDTH, GRID_DX, GRID_DY, Dir
+
+from . import Brick
+
+
+@dataclass
+class BrickGrid:
+    """Occupancy grid mapping every GRID_DX x GRID_DY cell of the game field to the store_id of the brick covering
+    it, or -1 for an empty cell."""
+
+    n_cols: int = GAME_FIELD_WIDTH // GRID_DX
+    n_rows: int = GAME_FIELD_HEIGHT // GRID_DY
+    cells: list[int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.cells = [-1] * (self.n_cols * self.n_rows)
+
+    @classmethod
+    def from_bricks(cls, bricks: list[Brick]) -> "BrickGrid":
+        grid = cls()
+        for brick in bricks:
+            grid.add(brick)
+        return grid
+
+    def brick_cells(self, brick: Brick) -> Iterator[int]:
+        col0, row0 = brick.rect.left // GRID_DX, brick.rect.top // GRID_DY
+        for row in range(row0, row0 + brick.rect.height // GRID_DY):
+            for col in range(col0, col0 + brick.rect.width // GRID_DX):
+                if 0 <= col < self.n_cols and 0 <= row < self.n_rows:
+                    yield row * self.n_cols + col
+
+    def add(self, brick: Brick) -> None:
+        for cell in self.brick_cells(brick):
+            self.cells[cell] = brick.store_id
+
+    def remove(self, brick: Brick) -> None:
+        for cell in self.brick_cells(brick):
+            if self.cells[cell] == brick.store_id:
+                self.cells[cell] = -1
+
+    def covering_brick(self, col0: int, row0: int, n_cols: int, n_rows: int) -> int | None:
+        """Id of the brick covering every cell of the block on its own, -1 if there is none and None if the block
+        reaches outside of the grid"""
+        if col0 < 0 or row0 < 0 or col0 + n_cols > self.n_cols or row0 + n_rows > self.n_rows:
+            return None
+        brick_id = self.cells[row0 * self.n_cols + col0]
+        for row in range(row0, row0 + n_rows):
+            for col in range(col0, col0 + n_cols):
+                if self.cells[row * self.n_cols + col] != brick_id:
+                    return -1
+        return brick_id
+
+    def side_masks(self, brick: Brick) -> tuple[int, int]:
+        """Collision sides of brick that are not covered by a single neighboring brick.
+
+        Returns:
+            tuple[int, int]: Mask of the open sides and mask of the sides facing out of the grid, which can only be
+            covered by entities outside of it like the edges.
+        """
+        col0, row0 = brick.rect.left // GRID_DX, brick.rect.top // GRID_DY
+        n_cols, n_rows = brick.rect.width // GRID_DX, brick.rect.height // GRID_DY
+        open_mask, outside_mask = 0, 0
+        for side, block in (
+            (Dir.LEFT, (col0 - 1, row0, 1, n_rows)),
+            (Dir.RIGHT, (col0 + n_cols, row0, 1, n_rows)),
+            (Dir.TOP, (col0, row0 - 1, n_cols, 1)),
+            (Dir.BOTTOM, (col0, row0 + n_rows, n_cols, 1)),
+        ):
+            covering = self.covering_brick(*block)
+            if covering is None:
+                outside_mask |= DIR_MASKS[side]
+            elif covering < 0:
+                open_mask |= DIR_MASKS[side]
+        return open_mask, outside_mask
+
+    def walk(self, rect: pg.Rect, vel: pg.Vector2, dt: float) -> Iterator[tuple[float, list[int]]]:
+        """Walks the grid cells crossed by the center of rect while it moves with vel for dt (Amanatides-Woo).
+
+        For every visited cell the bricks within reach of rect are yielded together with the time the center enters
+        the cell. Each brick is only yielded once, so the caller can stop as soon as it has found a collision that
+        happens before the entry time of the next cell.
+
+        Args:
+            rect (pg.Rect): Rect of the moving entity.
+            vel (pg.Vector2): Velocity in pix/ms.
+            dt (float): Time to move in ms.
+
+        Yields:
+            Iterator[tuple[float, list[int]]]: Entry time of the cell and the ids of the not yet seen bricks around it.
+        """
+        x, y = rect.center
+        col, row = int(x // GRID_DX), int(y // GRID_DY)
+
+        # Number of cells the rect can reach out of the cell holding its center
+        reach_cols = int(rect.width / 2 // GRID_DX) + 1
+        reach_rows = int(rect.height / 2 // GRID_DY) + 1
+
+        if vel.x > 0:
+            step_col, t_max_x, t_delta_x = 1, ((col + 1) * GRID_DX - x) / vel.x, GRID_DX / vel.x
+        elif vel.x < 0:
+            step_col, t_max_x, t_delta_x = -1, (col * GRID_DX - x) / vel.x, -GRID_DX / vel.x
+        else:
+            step_col, t_max_x, t_delta_x = 0, inf, inf
+
+        if vel.y > 0:
+            step_row, t_max_y, t_delta_y = 1, ((row + 1) * GRID_DY - y) / vel.y, GRID_DY / vel.y
+        elif vel.y < 0:
+            step_row, t_max_y, t_delta_y = -1, (row * GRID_DY - y) / vel.y, -GRID_DY / vel.y
+        else:
+            step_row, t_max_y, t_delta_y = 0, inf, inf
+
+        seen: set[int] = set()
+        t_enter: float = 0
+        while t_enter <= dt:
+            # Stop when the walk has left the grid and is moving away from it
+            if (step_col <= 0 and col < -reach_cols) or (step_col >= 0 and col >= self.n_cols + reach_cols):
+                return
+            if (step_row <= 0 and row < -reach_rows) or (step_row >= 0 and row >= self.n_rows + reach_rows):
+                return
+
+            brick_ids: list[int] = []
+            for r in range(max(row - reach_rows, 0), min(row + reach_rows + 1, self.n_rows)):
+                for c in range(max(col - reach_cols, 0), min(col + reach_cols + 1, self.n_cols)):
+                    brick_id = self.cells[r * self.n_cols + c]
+                    if brick_id >= 0 and brick_id not in seen:
+                        seen.add(brick_id)
+                        brick_ids.append(brick_id)
+            yield t_enter, brick_ids
+
+            if t_max_x < t_max_y:
+                col += step_col
+                t_enter = t_max_x
+                t_max_x += t_delta_x
+            else:
+                row += step_row
+                t_enter = t_max_y
+                t_max_y += t_delta_y
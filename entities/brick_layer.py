@@ -0,0 +1,57 @@
+from collections.abc import Iterable, Sequence
+
+import pygame as pg
+
+from constants import COLORS, GAME_FIELD_SIZE, GAME_FIELD_SURFACE
+
+from . import Brick
+
+
+class BrickLayer:
+    """Brick field rendered once into a cached surface.
+
+    Only the area of bricks that are deleted or change collision sides is redrawn, every frame the whole layer is
+    blitted in one go.
+    """
+
+    def __init__(self, bricks: Sequence[Brick]) -> None:
+        self.surface: pg.Surface = pg.Surface(GAME_FIELD_SIZE)
+        self.surface.set_colorkey(COLORS["COLORKEY"])
+        self.surface.fill(COLORS["COLORKEY"])
+
+        # Areas redrawn since the layer was last rendered in full
+        self.dirty_rects: list[pg.Rect] = []
+
+        for brick in bricks:
+            brick.render(self.surface)
+
+    def update(self, bricks: Iterable[Brick]) -> None:
+        """Redraws the area of each brick in bricks, erasing the ones flagged for deletion"""
+        for brick in bricks:
+            area = brick.render_rect()
+            self.surface.fill(COLORS["COLORKEY"], area)
+            self.dirty_rects.append(area)
+
+            # Neighbors draw collision side lines into the area as well
+            self.surface.set_clip(area)
+            for b in [brick, *brick.neighbors]:
+                if not b.to_be_deleted_flag:
+                    b.render(self.surface)
+            self.surface.set_clip(None)
+
+    def snapshot(self) -> pg.Surface:
+        saved = self.surface.copy()
+        # Restoring overwrites every pixel, erased areas included
+        saved.set_colorkey(None)
+        return saved
+
+    def restore(self, saved: pg.Surface) -> None:
+        self.surface.blit(saved, (0, 0))
+        self.dirty_rects.append(self.surface.get_rect())
+
+    def render(self) -> None:
+        GAME_FIELD_SURFACE.blit(self.surface, (0, 0))
+        self.dirty_rects.clear()
+
+    def render_area(self, area: pg.Rect) -> None:
+        GAME_FIELD_SURFACE.blit(self.surface, area, area)
@@ -0,0 +1,117 @@
+from collections.abc import Sequence
+
+import numpy as np
+import pygame as pg
+
+from constants import DT_TOL
+
+from . import Brick, BrickGrid, Collision, sweep
+
+
+class BrickStore:
+    """Struct of arrays holding the collision state of all bricks of a level.
+
+    The Brick objects stay around as views used for rendering and scoring, each one knows its index into the arrays
+    through store_id. Health and collision sides are owned by the store.
+    """
+
+    def __init__(self, bricks: list[Brick]) -> None:
+        self.bricks: list[Brick] = list(bricks)
+        n = len(bricks)
+
+        self.boxes: list[tuple[int, int, int, int]] = []  # left, top, right, bottom of each brick
+        self.health: np.ndarray = np.zeros(n, dtype=np.int32)
+        self.max_health: np.ndarray = np.zeros(n, dtype=np.int32)
+        self.side_mask: np.ndarray = np.zeros(n, dtype=np.uint8)
+        self.alive: np.ndarray = np.ones(n, dtype=np.bool_)
+        self.killed: list[Brick] = []  # bricks whose health dropped to 0, emptied by the deletion pass
+        self.changed: list[int] = []  # ids of bricks whose health, sides or alive flag changed, emptied by the rewind
+
+        for i, brick in enumerate(bricks):
+            brick.store = self
+            brick.store_id = i
+            self.boxes.append((brick.rect.left, brick.rect.top, brick.rect.right, brick.rect.bottom))
+            self.health[i] = self.max_health[i] = brick.max_health
+            self.side_mask[i] = brick.enabled_collision_sides
+
+        self.grid: BrickGrid = BrickGrid.from_bricks(bricks)
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[int]]:
+        """Copies of the state that changes while a level is played, the rest is fixed once the store is built"""
+        return self.health.copy(), self.side_mask.copy(), self.alive.copy(), list(self.grid.cells)
+
+    def restore(self, saved: tuple[np.ndarray, np.ndarray, np.ndarray, list[int]]) -> None:
+        health, side_mask, alive, cells = saved
+        np.copyto(self.health, health)
+        np.copyto(self.side_mask, side_mask)
+        np.copyto(self.alive, alive)
+        self.grid.cells[:] = cells
+        self.killed.clear()
+        self.changed.clear()
+
+    def take_damage(self, brick_id: int, damage: int) -> bool:
+        was_alive = self.health[brick_id] > 0
+        self.health[brick_id] -= damage
+        self.changed.append(brick_id)
+        dead = bool(self.health[brick_id] <= 0)
+        if dead and was_alive:
+            self.killed.append(self.bricks[brick_id])
+        return dead
+
+    def set_side_mask(self, brick: Brick, mask: int) -> None:
+        self.side_mask[brick.store_id] = mask
+        brick.enabled_collision_sides = mask
+        self.changed.append(brick.store_id)
+
+    def remove(self, brick: Brick) -> None:
+        self.alive[brick.store_id] = False
+        self.side_mask[brick.store_id] = 0
+        self.changed.append(brick.store_id)
+        self.grid.remove(brick)
+
+    def revive(self, brick: Brick) -> None:
+        """Undoes remove, the health and side mask of the brick are set by the caller"""
+        self.alive[brick.store_id] = True
+        self.grid.add(brick)
+
+    def find_path_collisions(
+        self, rect: pg.Rect, vel: pg.Vector2, dt: float, earliest: list[Collision]
+    ) -> list[Collision]:
+        """Adds the earliest collisions with the bricks in the grid cells crossed by rect moving with vel for dt to
+        earliest, walking the cells in the order they are crossed.
+
+        A brick can only be hit after the cell it is first found in is entered, so the walk stops at the first cell
+        entered more than DT_TOL after the earliest collision found so far.
+
+        Returns:
+            list[Collision]: earliest, see add_collision.
+        """
+        for t_enter, brick_ids in self.grid.walk(rect, vel, dt):
+            if earliest and t_enter > earliest[0].dt + DT_TOL:
+                break
+            if brick_ids:
+                self.find_collisions(rect, vel, dt, brick_ids, earliest)
+        return earliest
+
+    def find_collisions(
+        self, rect: pg.Rect, vel: pg.Vector2, dt: float, ids: Sequence[int], earliest: list[Collision]
+    ) -> list[Collision]:
+        """Adds the earliest collisions of the ball with the bricks in ids to earliest, each brick swept on its own
+        like the other entities.
+
+        Args:
+            rect (pg.Rect): Rect of the ball.
+            vel (pg.Vector2): Velocity of the ball in pix/ms.
+            dt (float): Remaining time in ms.
+            ids (Sequence[int]): Ids of the bricks to test.
+            earliest (list[Collision]): Earliest collisions found so far, see add_collision.
+
+        Returns:
+            list[Collision]: earliest.
+        """
+        vx, vy = vel
+        for brick_id in ids:
+            sides = int(self.side_mask[brick_id])
+            if sides:
+                sweep(rect, vx, vy, dt, *self.boxes[brick_id], sides, self.bricks[brick_id], earliest)
+        return earliest
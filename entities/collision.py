@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from math import inf
+from typing import TYPE_CHECKING
+
+import pygame as pg
+
+from constants import COLLISION_TOL, DT_TOL, SIDE_BOTTOM, SIDE_LEFT, SIDE_RIGHT, SIDE_TOP
+
+if TYPE_CHECKING:
+    from . import Entity
+
+
+@dataclass(slots=True)
+class Collision:
+    dt: float  # ms until the ball touches entity
+    entity: "Entity"
+    side: int  # side of the ball touching entity, a SIDE_ bit
+
+
+def add_collision(earliest: list[Collision], dt: float, entity: "Entity", side: int) -> None:
+    """Adds a collision to earliest if it happens within DT_TOL of the first one.
+
+    earliest holds the first collision and the ones within DT_TOL of it, ordered by time, collisions found at the same
+    time stay in the order they were added. Collisions that are no longer within DT_TOL of the first are dropped, so
+    a single pass over all candidates leaves exactly the collisions to resolve next.
+    """
+    i = len(earliest)
+    if i and dt - earliest[0].dt > DT_TOL:
+        return
+    while i and earliest[i - 1].dt > dt:
+        i -= 1
+    earliest.insert(i, Collision(dt, entity, side))
+    if i == 0:
+        while earliest[-1].dt - dt > DT_TOL:
+            earliest.pop()
+
+
+def sweep(
+    rect: pg.Rect,
+    vx: float,
+    vy: float,
+    dt: float,
+    left: float,
+    top: float,
+    right: float,
+    bottom: float,
+    sides: int,
+    entity: "Entity",
+    earliest: list[Collision],
+) -> None:
+    """Adds the first collision of rect moving with (vx, vy) for dt with the box left, top, right, bottom to earliest.
+
+    Only the sides of the box in the mask sides can be hit. The side entered last is the one hit, both when they are
+    entered within DT_TOL of each other.
+    """
+    # Gap to close before touching the box and time spent overlapping it along x
+    # collide left side of rect with right side of the box
+    if vx < 0:
+        gap_x = rect.left - right
+        dtx_in = gap_x / -vx
+        dtx_out = (rect.right - left) / -vx
+        side_x, box_side_x = SIDE_LEFT, SIDE_RIGHT
+    # collide right side of rect with left side of the box
+    elif vx > 0:
+        gap_x = left - rect.right
+        dtx_in = gap_x / vx
+        dtx_out = (right - rect.left) / vx
+        side_x, box_side_x = SIDE_RIGHT, SIDE_LEFT
+    elif rect.right > left and rect.left < right:
+        gap_x, dtx_in, dtx_out = -inf, -inf, inf
+        side_x, box_side_x = 0, 0
+    else:
+        return
+
+    # collide top side of rect with bottom side of the box
+    if vy < 0:
+        gap_y = rect.top - bottom
+        dty_in = gap_y / -vy
+        dty_out = (rect.bottom - top) / -vy
+        side_y, box_side_y = SIDE_TOP, SIDE_BOTTOM
+    # collide bottom side of rect with top side of the box
+    elif vy > 0:
+        gap_y = top - rect.bottom
+        dty_in = gap_y / vy
+        dty_out = (bottom - rect.top) / vy
+        side_y, box_side_y = SIDE_BOTTOM, SIDE_TOP
+    elif rect.bottom > top and rect.top < bottom:
+        gap_y, dty_in, dty_out = -inf, -inf, inf
+        side_y, box_side_y = 0, 0
+    else:
+        return
+
+    dt_in = max(dtx_in, dty_in)
+    dt_out = min(dtx_out, dty_out)
+
+    # Misses the box or hits it after dt
+    if dt_in >= dt_out or dt_out <= 0 or dt_in > dt:
+        return
+
+    # Already inside the box by more than the tolerance, e.g. when the paddle moved into the ball
+    if max(gap_x, gap_y) < -COLLISION_TOL:
+        return
+
+    # Sides covered by a neighbor are never hit, the neighbor is
+    if sides & box_side_x and dtx_in >= dty_in - DT_TOL:
+        add_collision(earliest, max(dtx_in, 0), entity, side_x)
+    if sides & box_side_y and dty_in >= dtx_in - DT_TOL:
+        add_collision(earliest, max(dty_in, 0), entity, side_y)
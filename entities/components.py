@@ -1,19 +1,33 @@
 from abc import ABC
+from collections.abc import Iterable
 from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import ClassVar
 
+import numpy as np
 import pygame as pg
-from pygame.typing import ColorLike, Point
+from pygame.typing import ColorLike
 
-from constants import GAME_FIELD_SURFACE, SCREEN
+from constants import BALL_TRAIL_CAPACITY, BALL_TRAIL_TOLERANCE, GAME_FIELD_SURFACE, SCREEN
 import globals
 
 
+class Hook(Enum):
+    UPDATE = auto()  # once per frame
+    RENDER = auto()  # after the owning entity is rendered
+    MOVE = auto()  # after the owning entity moved
+    COLLISION = auto()  # when a ball collides with the owning entity
+    DELETE = auto()  # when the owning entity is deleted
+
+
 @dataclass
-class Component(ABC): ...
+class Component(ABC):
+    hooks: ClassVar[frozenset[Hook]] = frozenset()
 
 
 @dataclass
 class ScoreComponent(Component):
+    hooks: ClassVar[frozenset[Hook]] = frozenset([Hook.COLLISION, Hook.DELETE])
     score_death: int
     score_hit: int
 
@@ -26,6 +40,7 @@ class ScoreComponent(Component):
 
 @dataclass
 class HealthComponent(Component):
+    hooks: ClassVar[frozenset[Hook]] = frozenset([Hook.COLLISION])
     health: int
     max_health: int
 
@@ -39,40 +54,158 @@ class HealthComponent(Component):
 
 @dataclass
 class BallTrailComponent(Component):
+    """Trail of the last trail_length ms of positions, kept in a ring buffer of (timestamp, x, y) rows.
+
+    Every row is written twice, at i and i + capacity, so the live part of the ring is always the contiguous slice
+    points[head : head + size] even when it wraps around. When the ring is full the oldest point is dropped.
+
+    Points are simplified as they are added: a point that stays within tolerance pix of the line from the point before
+    it to the new one is replaced by the new one, so a ball moving in a straight line only keeps its bounce points.
+    The tail is cut at exactly trail_length ms by moving the oldest point along its segment.
+    """
+
+    hooks: ClassVar[frozenset[Hook]] = frozenset([Hook.UPDATE, Hook.RENDER, Hook.MOVE])
+
     trail_length: int  # ms
     color: ColorLike
-
-    coordinates: list[Point] = field(default_factory=lambda: [], init=False)
-    cumulative_time: list[int] = field(default_factory=lambda: [], init=False)
+    capacity: int = BALL_TRAIL_CAPACITY  # points
+    tolerance: float = BALL_TRAIL_TOLERANCE  # pix, 0 keeps every point
+
+    points: np.ndarray = field(init=False, repr=False)
+    head: int = field(default=0, init=False)
+    size: int = field(default=0, init=False)
+    time: float = field(default=0, init=False)  # ms
+    new_points: int = field(default=0, init=False)  # points changed since the last render_new
+
+    def __post_init__(self) -> None:
+        self.points = np.zeros((2 * self.capacity, 3))
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """View of the (x, y) points of the trail, oldest first"""
+        return self.points[self.head : self.head + self.size, 1:]
+
+    def clear(self) -> None:
+        self.head = self.size = self.new_points = 0
+        self.time = 0
+
+    def write(self, i: int, stamp: float, x: float, y: float) -> None:
+        self.points[i] = self.points[i + self.capacity] = (stamp, x, y)
+
+    def is_redundant(self, x: float, y: float) -> bool:
+        """Whether the last point lies within tolerance of the line from the point before it to (x, y)"""
+        if self.tolerance <= 0 or self.size < 2:
+            return False
+        _, ax, ay, _, bx, by = self.points[self.head + self.size - 2 : self.head + self.size].flat
+
+        # Never merge a reversal, the ball came back along the same line
+        if (bx - ax) * (x - bx) + (by - ay) * (y - by) < 0:
+            return False
+
+        dx, dy = x - ax, y - ay
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            return (bx - ax) ** 2 + (by - ay) ** 2 <= self.tolerance**2
+        cross = (bx - ax) * dy - (by - ay) * dx
+        return cross * cross <= self.tolerance**2 * length_sq
 
     def add_segment(self, coord, dt) -> None:
-        self.coordinates.append(coord)
-        self.cumulative_time = [ct + dt for ct in self.cumulative_time]
-        self.cumulative_time.append(dt)
+        # A point is stamped with the time before its dt is added, it expires trail_length ms after that
+        stamp = self.time
+        self.time += dt
+        x, y = coord
+
+        if self.is_redundant(x, y):
+            self.write((self.head + self.size - 1) % self.capacity, stamp, x, y)
+            self.new_points = max(self.new_points, 1)
+            return
 
-    def update(self) -> None:
-        self.coordinates = [c for c, ct in zip(self.coordinates, self.cumulative_time) if ct < self.trail_length]
-        self.cumulative_time = [ct for ct in self.cumulative_time if ct < self.trail_length]
+        if self.size == self.capacity:
+            self.head = (self.head + 1) % self.capacity
+            self.size -= 1
+
+        self.write((self.head + self.size) % self.capacity, stamp, x, y)
+        self.size += 1
+        self.new_points += 1
 
-    def render(self) -> None:
-        if len(self.coordinates) < 2:
+    def update(self) -> None:
+        cutoff = self.time - self.trail_length
+        stamps = self.points[self.head : self.head + self.size, 0]
+        expired = int(np.searchsorted(stamps, cutoff, side="right"))
+        if expired == 0:
+            return
+        if expired == self.size:
+            self.head = (self.head + expired) % self.capacity
+            self.size = 0
             return
-        pg.draw.aalines(GAME_FIELD_SURFACE, self.color, False, self.coordinates)
-
-
-on_collision_components_list: list[type[Component]] = [
-    HealthComponent,
-    ScoreComponent,
-]
-on_delete_component_list: list[type[Component]] = [
-    ScoreComponent,
-]
-on_move_component_list: list[type[Component]] = [
-    BallTrailComponent,
-]
-on_update_component_list: list[type[Component]] = [
-    BallTrailComponent,
-]
-on_render_component_list: list[type[Component]] = [
-    BallTrailComponent,
-]
+
+        # Keep the last expired point, moved along its segment to where the trail ends at cutoff
+        expired -= 1
+        self.head = (self.head + expired) % self.capacity
+        self.size -= expired
+        ta, ax, ay, tb, bx, by = self.points[self.head : self.head + 2].flat
+        f = (cutoff - ta) / (tb - ta)
+        self.write(self.head, cutoff, ax + (bx - ax) * f, ay + (by - ay) * f)
+
+    def render(self, surface: pg.Surface = GAME_FIELD_SURFACE, head: pg.typing.Point | None = None) -> pg.Rect | None:
+        """Draws the trail, ending at head instead of the last point if given"""
+        if self.size < 2:
+            return None
+        coordinates = self.coordinates
+        if head is not None:
+            coordinates = coordinates.copy()
+            coordinates[-1] = head
+        return pg.draw.aalines(surface, self.color, False, coordinates)
+
+    def render_new(self, surface: pg.Surface) -> pg.Rect | None:
+        """Draws only the segments added since the last call, for trails accumulated on a fading TrailLayer"""
+        n = min(self.new_points + 1, self.size)
+        self.new_points = 0
+        if n < 2:
+            return None
+        end = self.head + self.size
+        return pg.draw.aalines(surface, self.color, False, self.points[end - n : end, 1:])
+
+
+class ComponentRegistry:
+    """Live components grouped by the hooks they subscribe to, so a hook pass only visits the components using it.
+
+    Unregistering swaps the last component of a hook into the freed slot, the order of a hook is not kept.
+    """
+
+    def __init__(self, components: Iterable[Component] = ()) -> None:
+        self.hooks: dict[Hook, list[Component]] = {hook: [] for hook in Hook}
+        # Index of every component in the list of each of its hooks, by id since components compare by value
+        self.slots: dict[Hook, dict[int, int]] = {hook: {} for hook in Hook}
+        self.register(components)
+
+    def __getitem__(self, hook: Hook) -> list[Component]:
+        return self.hooks[hook]
+
+    def register(self, components: Iterable[Component]) -> None:
+        for component in components:
+            for hook in component.hooks:
+                self.slots[hook][id(component)] = len(self.hooks[hook])
+                self.hooks[hook].append(component)
+
+    def unregister(self, components: Iterable[Component]) -> None:
+        for component in components:
+            for hook in component.hooks:
+                hooked, slots = self.hooks[hook], self.slots[hook]
+                slot = slots.pop(id(component))
+                last = hooked.pop()
+                if last is not component:
+                    hooked[slot] = last
+                    slots[id(last)] = slot
+
+    def snapshot(self) -> tuple[dict[Hook, list[Component]], dict[Hook, dict[int, int]]]:
+        return {hook: list(hooked) for hook, hooked in self.hooks.items()}, {
+            hook: dict(slots) for hook, slots in self.slots.items()
+        }
+
+    def restore(self, saved: tuple[dict[Hook, list[Component]], dict[Hook, dict[int, int]]]) -> None:
+        hooks, slots = saved
+        for hook in Hook:
+            self.hooks[hook][:] = hooks[hook]
+            self.slots[hook].clear()
+            self.slots[hook].update(slots[hook])
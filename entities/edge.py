@@ -1,5 +1,15 @@
 from dataclasses import dataclass, field
-from constants import COLORS, EDGE_WIDTH, GAME_FIELD_HEIGHT, GAME_FIELD_RECT_TO_SCREEN, GAME_FIELD_WIDTH, SCREEN, Dir
+from constants import (
+    COLORS,
+    EDGE_WIDTH,
+    GAME_FIELD_HEIGHT,
+    GAME_FIELD_RECT_TO_SCREEN,
+    GAME_FIELD_WIDTH,
+    SCREEN,
+    SIDE_BOTTOM,
+    SIDE_LEFT,
+    SIDE_RIGHT,
+)
 from . import Entity
 
 
@@ -9,7 +19,7 @@ import pygame as pg
 from abc import abstractmethod
 
 
-@dataclass
+@dataclass(slots=True)
 class Edge(Entity):
     color: pg.typing.ColorLike = COLORS["WHITE"]
     render_flag: bool = False
@@ -17,47 +27,41 @@ class Edge(Entity):
     @abstractmethod
     def render_transform(self) -> dict[str, tuple[int, int]]: ...
 
-    def render(self) -> None:
+    def render(self, surface: pg.Surface = SCREEN) -> None:
         # EDGES RENDER DIRECTLY TO SCREEN
         if self.render_flag:
-            pg.draw.rect(SCREEN, self.color, self.rect.move_to(**self.render_transform()))
+            pg.draw.rect(surface, self.color, self.rect.move_to(**self.render_transform()))
 
 
-@dataclass
+@dataclass(slots=True)
 class LeftEdge(Edge):
     rect: pg.Rect = field(
         default_factory=lambda: pg.Rect((-EDGE_WIDTH, 0), (EDGE_WIDTH, GAME_FIELD_HEIGHT)), init=False
     )
-
-    def __post_init__(self) -> None:
-        self.enabled_collision_sides = set([Dir.RIGHT])
+    enabled_collision_sides: int = SIDE_RIGHT
 
     def render_transform(self) -> dict[str, tuple[int, int]]:
         return {"bottomright": GAME_FIELD_RECT_TO_SCREEN.bottomleft}
 
 
-@dataclass
+@dataclass(slots=True)
 class RightEdge(Edge):
     rect: pg.Rect = field(
         default_factory=lambda: pg.Rect((GAME_FIELD_WIDTH, 0), (EDGE_WIDTH, GAME_FIELD_HEIGHT)), init=False
     )
-
-    def __post_init__(self) -> None:
-        self.enabled_collision_sides = set([Dir.LEFT])
+    enabled_collision_sides: int = SIDE_LEFT
 
     def render_transform(self) -> dict[str, tuple[int, int]]:
         return {"bottomleft": GAME_FIELD_RECT_TO_SCREEN.bottomright}
 
 
-@dataclass
+@dataclass(slots=True)
 class TopEdge(Edge):
     rect: pg.Rect = field(
-        default_factory=lambda: pg.Rect((EDGE_WIDTH, -EDGE_WIDTH), (GAME_FIELD_WIDTH + 2 * EDGE_WIDTH, EDGE_WIDTH)),
+        default_factory=lambda: pg.Rect((-EDGE_WIDTH, -EDGE_WIDTH), (GAME_FIELD_WIDTH + 2 * EDGE_WIDTH, EDGE_WIDTH)),
         init=False,
     )
-
-    def __post_init__(self) -> None:
-        self.enabled_collision_sides = set([Dir.BOTTOM])
+    enabled_collision_sides: int = SIDE_BOTTOM
 
     def render_transform(self) -> dict[str, tuple[int, int]]:
         return {"midbottom": GAME_FIELD_RECT_TO_SCREEN.midtop}
@@ -4,42 +4,70 @@ from typing import Sequence
 
 import pygame as pg
 
-from . import BallTrailComponent, Component, on_move_component_list
+from . import BallTrailComponent, Component, ComponentRegistry, Hook
 
 from constants import (
+    ALL_SIDES,
     COLORS,
     DEBUG,
     GAME_FIELD_SURFACE,
-    Dir,
+    SIDE_BOTTOM,
+    SIDE_LEFT,
+    SIDE_RIGHT,
+    SIDE_TOP,
 )
 
 
-@dataclass
+@dataclass(slots=True)
 class Entity(ABC):
+    """Base of everything in the game field.
+
+    Entities are slots dataclasses, which replaces the decorated class by a new one, so their methods call super with
+    explicit arguments.
+    """
+
     rect: pg.Rect
     color: pg.typing.ColorLike
     components: list[Component] = field(default_factory=lambda: [])
-    enabled_collision_sides: set[Dir] = field(default_factory=lambda: set([Dir.LEFT, Dir.RIGHT, Dir.UP, Dir.DOWN]))
+    enabled_collision_sides: int = ALL_SIDES  # mask of SIDE_ bits
     to_be_deleted_flag: bool = False
     render_flag: bool = True
+    component_hooks: ComponentRegistry = field(init=False, repr=False, compare=False)
+    handle: int = field(init=False, repr=False, compare=False)  # set by EntityStore, -1 until then
+
+    def __post_init__(self) -> None:
+        self.component_hooks = ComponentRegistry(self.components)
+        self.handle = -1
 
-    def render(self) -> None:
+    def add_component(self, component: Component) -> None:
+        self.components.append(component)
+        self.component_hooks.register([component])
+
+    def render(self, surface: pg.Surface = GAME_FIELD_SURFACE, rect: pg.Rect | None = None) -> None:
+        """Draws the entity at rect, its own rect if None"""
+        rect = self.rect if rect is None else rect
         if self.render_flag:
-            pg.draw.rect(GAME_FIELD_SURFACE, self.color, self.rect)
+            pg.draw.rect(surface, self.color, rect)
 
         if DEBUG:
-            self.debug_render()
+            self.debug_render(surface, rect)
 
-    def debug_render(self) -> None:
+    def debug_render(self, surface: pg.Surface = GAME_FIELD_SURFACE, rect: pg.Rect | None = None) -> None:
         # render collision sides
-        if Dir.LEFT in self.enabled_collision_sides:
-            pg.draw.line(GAME_FIELD_SURFACE, COLORS["DEBUG"], self.rect.topleft, self.rect.bottomleft)
-        if Dir.RIGHT in self.enabled_collision_sides:
-            pg.draw.line(GAME_FIELD_SURFACE, COLORS["DEBUG"], self.rect.topright, self.rect.bottomright)
-        if Dir.TOP in self.enabled_collision_sides:
-            pg.draw.line(GAME_FIELD_SURFACE, COLORS["DEBUG"], self.rect.topleft, self.rect.topright)
-        if Dir.BOTTOM in self.enabled_collision_sides:
-            pg.draw.line(GAME_FIELD_SURFACE, COLORS["DEBUG"], self.rect.bottomleft, self.rect.bottomright)
+        rect = self.rect if rect is None else rect
+        if self.enabled_collision_sides & SIDE_LEFT:
+            pg.draw.line(surface, COLORS["DEBUG"], rect.topleft, rect.bottomleft)
+        if self.enabled_collision_sides & SIDE_RIGHT:
+            pg.draw.line(surface, COLORS["DEBUG"], rect.topright, rect.bottomright)
+        if self.enabled_collision_sides & SIDE_TOP:
+            pg.draw.line(surface, COLORS["DEBUG"], rect.topleft, rect.topright)
+        if self.enabled_collision_sides & SIDE_BOTTOM:
+            pg.draw.line(surface, COLORS["DEBUG"], rect.bottomleft, rect.bottomright)
+
+    def render_rect(self, rect: pg.Rect | None = None) -> pg.Rect:
+        """Area touched by render, the collision side lines are drawn one pixel outside of rect"""
+        rect = self.rect if rect is None else rect
+        return pg.Rect(rect.left, rect.top, rect.width + 1, rect.height + 1)
 
     def neighbor_left_line(self) -> tuple[pg.Vector2, pg.Vector2]:
         return (self.rect.topleft + pg.Vector2(-1, 0), self.rect.bottomleft + pg.Vector2(-1, 0))
@@ -57,12 +85,23 @@ class Entity(ABC):
         return self.rect.copy().inflate(4, 4).colliderect(other.rect)
 
 
-@dataclass
+@dataclass(slots=True)
 class MovingEntity(Entity, ABC):
     speed: float = 0  # pix/ms
     min_speed: float = 0  # pix/ms
     max_speed: float = float("inf")  # pix/ms
     vel: pg.Vector2 = field(default_factory=lambda: pg.Vector2(0, 0))
+    prev_pos: pg.Vector2 = field(init=False, repr=False, compare=False)  # topleft before the last simulation step
+
+    def __post_init__(self) -> None:
+        super(MovingEntity, self).__post_init__()
+        self.prev_pos = pg.Vector2(self.rect.topleft)
+
+    def interpolated_rect(self, alpha: float) -> pg.Rect:
+        """rect between its position before the last simulation step, alpha 0, and its current one, alpha 1"""
+        x = self.prev_pos.x + (self.rect.x - self.prev_pos.x) * alpha
+        y = self.prev_pos.y + (self.rect.y - self.prev_pos.y) * alpha
+        return self.rect.move_to(topleft=(round(x), round(y)))
 
     @abstractmethod
     def move_and_collide(self, dt: float, others: Sequence[Entity]) -> None:
@@ -73,7 +112,7 @@ class MovingEntity(Entity, ABC):
         self.vel.clamp_magnitude_ip(0, self.max_speed)
         self.rect.move_ip(self.vel * dt)
 
-        for component in [c for c in self.components if type(c) in on_move_component_list]:
+        for component in self.component_hooks[Hook.MOVE]:
             match component:
                 case BallTrailComponent():
                     component.add_segment(self.rect.center, dt)
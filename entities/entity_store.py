@@ -0,0 +1,68 @@
+from . import Ball, Brick, Edge, Entity, Paddle
+
+
+class EntityStore:
+    """Live entities of a level, kept in one persistent list per category.
+
+    Every entity gets a handle when added that stays valid until it is removed. Removing swaps the last entity of the
+    category into the freed slot, so it is O(1) and the category lists can be iterated every frame without being
+    copied. The order inside a category is not kept across removals. Handles are never reused, an entity keeps its
+    handle when removed and gets it back when added again, so restoring a snapshot can put it back without touching
+    it.
+    """
+
+    def __init__(self) -> None:
+        self.edges: list[Edge] = []
+        self.bricks: list[Brick] = []
+        self.balls: list[Ball] = []
+        self.paddles: list[Paddle] = []
+        self.categories: dict[type[Entity], list] = {
+            Edge: self.edges,
+            Brick: self.bricks,
+            Ball: self.balls,
+            Paddle: self.paddles,
+        }
+
+        self.entities: dict[int, Entity] = {}  # handle -> entity
+        self.slots: dict[int, int] = {}  # handle -> index in its category list
+        self.next_handle: int = 0
+
+    def view(self, entity: Entity) -> list:
+        for category, view in self.categories.items():
+            if isinstance(entity, category):
+                return view
+        raise TypeError(f"{type(entity).__name__} is not stored in an EntityStore")
+
+    def add(self, entity: Entity) -> int:
+        view = self.view(entity)
+        if entity.handle < 0:
+            entity.handle = self.next_handle
+            self.next_handle += 1
+
+        self.entities[entity.handle] = entity
+        self.slots[entity.handle] = len(view)
+        view.append(entity)
+        return entity.handle
+
+    def remove(self, entity: Entity) -> None:
+        view = self.view(entity)
+        del self.entities[entity.handle]
+        slot = self.slots.pop(entity.handle)
+
+        last = view.pop()
+        if last is not entity:
+            view[slot] = last
+            self.slots[last.handle] = slot
+
+    def snapshot(self) -> tuple[list[list], dict[int, Entity], dict[int, int]]:
+        return [list(view) for view in self.categories.values()], dict(self.entities), dict(self.slots)
+
+    def restore(self, saved: tuple[list[list], dict[int, Entity], dict[int, int]]) -> None:
+        """Puts back the entities of a snapshot, the category lists are refilled in place"""
+        views, entities, slots = saved
+        for view, saved_view in zip(self.categories.values(), views):
+            view[:] = saved_view
+        self.entities.clear()
+        self.entities.update(entities)
+        self.slots.clear()
+        self.slots.update(slots)
@@ -1,19 +1,27 @@
-from constants import GAME_FIELD_SURFACE, PADDLE_MAX_SPEED, PADDLE_MIN_SPEED, PADDLE_START_SPEED, Dir
+from constants import (
+    GAME_FIELD_SURFACE,
+    PADDLE_MAX_SPEED,
+    PADDLE_MIN_SPEED,
+    PADDLE_START_SPEED,
+    SIDE_LEFT,
+    SIDE_RIGHT,
+    SIDE_TOP,
+)
 from . import MovingEntity
 
 
 import pygame as pg
 
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Paddle(MovingEntity):
     speed: float = PADDLE_START_SPEED  # pix/ms
     min_speed: float = PADDLE_MIN_SPEED  # pix/ms
     max_speed: float = PADDLE_MAX_SPEED  # pix/ms
-    enabled_collision_sides: set[Dir] = field(default_factory=lambda: set([Dir.LEFT, Dir.RIGHT, Dir.UP]))
+    enabled_collision_sides: int = SIDE_LEFT | SIDE_RIGHT | SIDE_TOP
 
     def handle_keyboard_input(self, key, event_type) -> None:
         if event_type == pg.KEYDOWN:
@@ -0,0 +1,27 @@
+import pygame as pg
+
+from constants import BALL_TRAIL_FADE_ALPHA, GAME_FIELD_SIZE, GAME_FIELD_SURFACE
+
+from . import BallTrailComponent
+
+
+class TrailLayer:
+    """Transparent surface the ball trails are accumulated on.
+
+    Every simulation step the whole layer loses BALL_TRAIL_FADE_ALPHA of alpha and each trail only draws the segments
+    added since the previous frame, so the cost does not grow with the number of points in the trails.
+    """
+
+    def __init__(self) -> None:
+        self.surface: pg.Surface = pg.Surface(GAME_FIELD_SIZE, pg.SRCALPHA)
+
+    def fade(self, steps: int = 1) -> None:
+        if steps > 0:
+            alpha = min(BALL_TRAIL_FADE_ALPHA * steps, 255)
+            self.surface.fill((0, 0, 0, alpha), special_flags=pg.BLEND_RGBA_SUB)
+
+    def draw(self, trail: BallTrailComponent) -> None:
+        trail.render_new(self.surface)
+
+    def render(self) -> pg.Rect:
+        return GAME_FIELD_SURFACE.blit(self.surface, (0, 0))
@@ -1,7 +1,7 @@
 # TODO fix score
 import pygame as pg
 
-from constants import COLORS, EDGE_WIDTH, FONT, GAME_FIELD_RECT_TO_SCREEN, SCREEN, UI_TEXT_SIZE
+from constants import COLORS, EDGE_WIDTH, GAME_FIELD_RECT_TO_SCREEN, SCREEN, UI_TEXT_SIZE, render_text
 
 
 def init_globals() -> None:
@@ -21,13 +21,15 @@ def reset_num_lives() -> None:
     num_lives = 0
 
 
-def render_score() -> None:
+def render_score() -> pg.Rect:
     global score
-    text, _ = FONT.render(f"score:{score:0>5}", COLORS["YELLOW"], size=UI_TEXT_SIZE)
-    SCREEN.blit(text, text.get_rect(topleft=GAME_FIELD_RECT_TO_SCREEN.topright + pg.Vector2(EDGE_WIDTH + 10, 0)))
+    text = render_text(f"score:{score:0>5}", COLORS["YELLOW"], UI_TEXT_SIZE)
+    return SCREEN.blit(text, text.get_rect(topleft=GAME_FIELD_RECT_TO_SCREEN.topright + pg.Vector2(EDGE_WIDTH + 10, 0)))
 
 
-def render_num_lives() -> None:
+def render_num_lives() -> pg.Rect:
     global num_lives
-    text, _ = FONT.render(f"Life: {score:.>6}", COLORS["YELLOW"], size=UI_TEXT_SIZE)
-    SCREEN.blit(text, text.get_rect(topleft=GAME_FIELD_RECT_TO_SCREEN.topright + pg.Vector2(EDGE_WIDTH + 10, 30)))
+    text = render_text(f"Life: {score:.>6}", COLORS["YELLOW"], UI_TEXT_SIZE)
+    return SCREEN.blit(
+        text, text.get_rect(topleft=GAME_FIELD_RECT_TO_SCREEN.topright + pg.Vector2(EDGE_WIDTH + 10, 30))
+    )
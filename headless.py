@@ -0,0 +1,105 @@
+"""Runs Game.game_loop_logic with a fixed dt and without opening a window or rendering anything.
+
+Import this module before anything else from the game, it sets MEMA_BRICKS_HEADLESS so constants.py creates an
+off-screen SCREEN instead of calling pg.display.set_mode.
+
+run using
+
+    uv run headless.py --frames 10000
+
+or replay a recorded game, as fast as possible and checking it plays out exactly as recorded
+
+    uv run headless.py --replay game.replay
+"""
+
+import os
+import sys
+
+if "constants" in sys.modules and os.environ.get("MEMA_BRICKS_HEADLESS") != "1":
+    raise ImportError("headless must be imported before constants")
+os.environ["MEMA_BRICKS_HEADLESS"] = "1"
+
+from argparse import ArgumentParser
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from time import perf_counter
+
+import pygame as pg
+
+from constants import SIM_DT, States
+from levels import LevelManager
+from main import Game
+from replay import InputRecorder, Replay, run_replay
+
+FIXED_DT: float = SIM_DT  # ms, one simulation step
+
+
+def run_headless(
+    game: Game,
+    n_frames: int,
+    dt: float = FIXED_DT,
+    input_events: Callable[[int], Sequence[pg.Event]] | None = None,
+    recorder: InputRecorder | None = None,
+) -> int:
+    """Steps game n_frames times with a fixed dt.
+
+    Args:
+        game (Game): Game to step.
+        n_frames (int): Number of frames to simulate.
+        dt (float, optional): Fixed frame time in ms. Defaults to FIXED_DT.
+        input_events (Callable[[int], Sequence[pg.Event]] | None, optional): Returns the input events of a frame
+            number. Defaults to no input.
+        recorder (InputRecorder | None, optional): Records every simulated frame. Defaults to None.
+
+    Returns:
+        int: Number of frames simulated, less than n_frames if the game left the running state.
+    """
+    for frame in range(n_frames):
+        if game.state != States.GAME_RUNNING:
+            return frame
+        events = input_events(frame) if input_events is not None else ()
+        if recorder is not None:
+            recorder.record(game, dt, events)
+        game.game_loop_logic(dt, events)
+    return n_frames
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Simulate the game without a window")
+    parser.add_argument("--lvl", default="lvl1.txt", help="map in assets/maps")
+    parser.add_argument("--frames", type=int, default=10_000)
+    parser.add_argument("--dt", type=float, default=FIXED_DT, help="fixed frame time in ms")
+    parser.add_argument("--record", type=Path, help="write the input of the simulated frames to this replay file")
+    parser.add_argument("--replay", type=Path, help="replay this file instead of simulating")
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        replay = Replay.load(args.replay)
+        game = Game(replay.lvl_id, levels=LevelManager(replay.lvl_ids))
+        t_start = perf_counter()
+        n_frames = run_replay(game, replay)
+        t_elapsed = perf_counter() - t_start
+
+        t_game = sum(frame.dt for frame in replay.frames[:n_frames] if frame.state == States.GAME_RUNNING) / 1000
+        print(
+            f"{n_frames} frames replayed in {t_elapsed:.3f} s, {n_frames / t_elapsed:.0f} frames/s, "
+            f"{t_game / t_elapsed:.1f}x real time"
+        )
+        return
+
+    game = Game(args.lvl)
+    recorder = InputRecorder(args.record, game.lvl_id, game.levels.lvl_ids) if args.record is not None else None
+    t_start = perf_counter()
+    n_frames = run_headless(game, args.frames, args.dt, recorder=recorder)
+    t_elapsed = perf_counter() - t_start
+
+    if recorder is not None:
+        game.state = States.EXITING
+        recorder.record(game, 0, [])
+        recorder.close()
+
+    print(f"{n_frames} frames in {t_elapsed:.3f} s, {n_frames / t_elapsed:.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Difficulty and coverage of the maps, measured by playing many seeded games with the batch autopilot.
+
+For every map the games are split into chunks played on a ProcessPoolExecutor. A chunk adds up, per brick, the hits
+taken (max_health - health at the end of a game), the games it was hit in and the games it was destroyed in, with one
+vectorized operation per game. The totals are spread over the 40 x 39 cells of the grid and saved as a heatmap image,
+hits per game on the left and the share of games a brick was hit in on the right. Bricks hit in fewer than
+--rare of the games are outlined and listed with their map coordinates.
+
+run using
+
+    uv run level_analysis.py --games 64
+    uv run level_analysis.py --lvl lvl1.txt --games 200 --out analysis
+"""
+
+# headless must be imported before constants
+from headless import FIXED_DT
+
+# isort: split
+import json
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pygame as pg
+
+from batch import BallParams, BatchJob, play_game
+from constants import COLORS, GRID_DX, GRID_DY, MAPS_PATH
+from entities import BrickStore
+from level_cache import LEVEL_N_COLS, LEVEL_N_ROWS, load_bricks
+
+ANALYSIS_CELL_SIZE: int = 12  # pix per grid cell in the heatmap image
+ANALYSIS_PANEL_GAP: int = 12  # pix between the two heatmaps
+# Color stops of the heatmap from 0 to the maximum, dark blue to yellow
+ANALYSIS_COLOR_STOPS: np.ndarray = np.array(
+    [(13, 8, 135), (126, 3, 168), (204, 71, 120), (248, 149, 64), (240, 249, 33)], dtype=np.float64
+)
+ANALYSIS_RARE_COLOR: pg.typing.ColorLike = (255, 0, 0)
+
+
+@dataclass
+class AnalysisChunk:
+    lvl_id: str
+    seeds: range
+    max_frames: int
+    params: BallParams = field(default_factory=BallParams)
+    dt: float = FIXED_DT
+
+
+@dataclass
+class LevelStats:
+    """Totals over the games of a level, per brick in store_id order"""
+
+    games: int
+    hits: np.ndarray
+    hit_games: np.ndarray
+    destroyed_games: np.ndarray
+    frames_to_clear: list[int]
+
+    def __add__(self, other: "LevelStats") -> "LevelStats":
+        return LevelStats(
+            self.games + other.games,
+            self.hits + other.hits,
+            self.hit_games + other.hit_games,
+            self.destroyed_games + other.destroyed_games,
+            self.frames_to_clear + other.frames_to_clear,
+        )
+
+
+def analyze_chunk(chunk: AnalysisChunk) -> LevelStats:
+    stats: LevelStats | None = None
+    for seed in chunk.seeds:
+        result, store = play_game(BatchJob(chunk.lvl_id, seed, chunk.max_frames, chunk.params, chunk.dt))
+        if stats is None:
+            n = len(store.bricks)
+            stats = LevelStats(0, np.zeros(n, np.int64), np.zeros(n, np.int64), np.zeros(n, np.int64), [])
+
+        hits = store.max_health - np.maximum(store.health, 0)
+        stats.games += 1
+        stats.hits += hits
+        stats.hit_games += hits > 0
+        stats.destroyed_games += ~store.alive
+        if result.cleared:
+            stats.frames_to_clear.append(result.frames)
+
+    assert stats is not None
+    return stats
+
+
+def analyze_level(
+    lvl_id: str, n_games: int, max_frames: int, executor: ProcessPoolExecutor, workers: int
+) -> LevelStats:
+    chunk_size = max(1, n_games // (4 * workers))
+    chunks = [
+        AnalysisChunk(lvl_id, range(start, min(start + chunk_size, n_games)), max_frames)
+        for start in range(0, n_games, chunk_size)
+    ]
+    totals = list(executor.map(analyze_chunk, chunks))
+    return sum(totals[1:], totals[0])
+
+
+def cell_grid(store: BrickStore, per_brick: np.ndarray) -> np.ndarray:
+    """per_brick spread over the cells each brick covers, NaN for empty cells"""
+    cells = np.array(store.grid.cells).reshape(LEVEL_N_ROWS, LEVEL_N_COLS)
+    return np.where(cells >= 0, per_brick[np.maximum(cells, 0)], np.nan)
+
+
+def cell_label(col: int, row: int) -> str:
+    """Coordinates of a cell as written in the map files, column letter then row number counted from the bottom"""
+    col_label = chr(97 + col) if col < 26 else chr(65 + col - 26)
+    return f"{col_label}{LEVEL_N_ROWS - row}"
+
+
+def colorize(grid: np.ndarray, vmax: float) -> np.ndarray:
+    """RGB image of grid, (rows, cols, 3)"""
+    t = np.nan_to_num(grid / vmax if vmax > 0 else grid * 0, nan=0.0) * (len(ANALYSIS_COLOR_STOPS) - 1)
+    stops = np.arange(len(ANALYSIS_COLOR_STOPS))
+    rgb = np.stack([np.interp(t, stops, ANALYSIS_COLOR_STOPS[:, c]) for c in range(3)], axis=-1)
+    rgb[np.isnan(grid)] = pg.Color(COLORS["DARK_GREY"])[:3]
+    return rgb.astype(np.uint8)
+
+
+def render_heatmap(panels: list[np.ndarray], rare: np.ndarray) -> pg.Surface:
+    """Panels side by side, each cell ANALYSIS_CELL_SIZE pix, with the cells in rare outlined"""
+    width = LEVEL_N_COLS * ANALYSIS_CELL_SIZE
+    height = LEVEL_N_ROWS * ANALYSIS_CELL_SIZE
+    surface = pg.Surface((len(panels) * width + (len(panels) - 1) * ANALYSIS_PANEL_GAP, height))
+    surface.fill(COLORS["BLACK"])
+
+    for i, rgb in enumerate(panels):
+        # surfarray is indexed x, y
+        cells = pg.surfarray.make_surface(np.ascontiguousarray(rgb.transpose(1, 0, 2)))
+        x = i * (width + ANALYSIS_PANEL_GAP)
+        surface.blit(pg.transform.scale(cells, (width, height)), (x, 0))
+        for row, col in zip(*np.nonzero(rare)):
+            cell = pg.Rect(
+                x + col * ANALYSIS_CELL_SIZE, row * ANALYSIS_CELL_SIZE, ANALYSIS_CELL_SIZE, ANALYSIS_CELL_SIZE
+            )
+            pg.draw.rect(surface, ANALYSIS_RARE_COLOR, cell, 1)
+
+    return surface
+
+
+def report(lvl_id: str, stats: LevelStats, rare_share: float, max_frames: int, out: Path) -> dict:
+    """Saves the heatmap, the grids and a json summary of a level to out, returns the summary"""
+    store = BrickStore(load_bricks(lvl_id))
+    hits_per_game = cell_grid(store, stats.hits / stats.games)
+    hit_share = cell_grid(store, stats.hit_games / stats.games)
+    destroyed_share = cell_grid(store, stats.destroyed_games / stats.games)
+    rare = hit_share < rare_share  # NaN compares False
+
+    # Each rare brick by the cell of its top left corner, the one the map file places it at
+    rare_ids = np.flatnonzero(stats.hit_games < rare_share * stats.games)
+    rare_bricks = [
+        cell_label(store.bricks[i].rect.left // GRID_DX, store.bricks[i].rect.top // GRID_DY) for i in rare_ids
+    ]
+    clear = np.array(stats.frames_to_clear)
+    summary = {
+        "lvl_id": lvl_id,
+        "games": stats.games,
+        "max_frames": max_frames,
+        "clear_rate": len(clear) / stats.games,
+        "frames_to_clear_p50": float(np.median(clear)) if len(clear) else None,
+        "frames_to_clear_p90": float(np.percentile(clear, 90)) if len(clear) else None,
+        "rare_share": rare_share,
+        "rare_bricks": rare_bricks,
+    }
+
+    out.mkdir(parents=True, exist_ok=True)
+    stem = Path(lvl_id).stem
+    heatmap = render_heatmap([colorize(hits_per_game, float(np.nanmax(hits_per_game))), colorize(hit_share, 1.0)], rare)
+    pg.image.save(heatmap, out / f"{stem}_heatmap.png")
+    np.savez(
+        out / f"{stem}_heatmap.npz",
+        hits_per_game=hits_per_game,
+        hit_share=hit_share,
+        destroyed_share=destroyed_share,
+        frames_to_clear=clear,
+    )
+    (out / f"{stem}_summary.json").write_text(json.dumps(summary, indent=4), encoding="utf8")
+    return summary
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Heatmaps of how the bricks of the maps get hit by simulated games")
+    parser.add_argument("--lvl", action="append", help="map in assets/maps, can be repeated, defaults to all of them")
+    parser.add_argument("--games", type=int, default=64, help="games per map")
+    parser.add_argument("--frames", type=int, default=60 * 60 * 3, help="frames a game may take to clear the map")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--rare", type=float, default=0.1, help="share of games below which a brick is rarely hit")
+    parser.add_argument("--out", type=Path, default=Path("analysis"), help="directory the results are saved to")
+    args = parser.parse_args()
+
+    lvl_ids = args.lvl or [path.name for path in sorted(MAPS_PATH.glob("*.txt"))]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for lvl_id in lvl_ids:
+            t_start = perf_counter()
+            stats = analyze_level(lvl_id, args.games, args.frames, executor, args.workers)
+            summary = report(lvl_id, stats, args.rare, args.frames, args.out)
+
+            p50 = summary["frames_to_clear_p50"]
+            print(
+                f"{lvl_id}: {stats.games} games in {perf_counter() - t_start:.1f} s, cleared "
+                f"{summary['clear_rate']:.0%}" + (f" in {p50:.0f} frames (p50)" if p50 is not None else "") + ", "
+                f"{len(summary['rare_bricks'])} bricks hit in less than {args.rare:.0%} of the games"
+            )
+
+
+if __name__ == "__main__":
+    main()
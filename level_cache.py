@@ -0,0 +1,153 @@
+"""Compiled levels cached on disk next to the text maps.
+
+A level is compiled from assets/maps/<lvl_id> into an .npz file in MAPS_CACHE_PATH holding the brick type grid, the
+neighbors of every brick and their collision side masks. Loading a level reads the compiled file with np.load and only
+has to create the Brick objects. The cache is keyed on the mtime and size of the text map and falls back to comparing
+its sha256, a stale or unreadable cache is recompiled from the text map.
+
+compile all maps using
+
+    uv run level_cache.py
+"""
+
+import hashlib
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from constants import GRID_DX, GRID_DY, MAPS_CACHE_PATH, MAPS_PATH
+from entities import Brick, BrickStore, LeftEdge, RightEdge, TopEdge, bricks_dict, update_enabled_collision_sides
+from map import create_brick, create_bricks_from_lvl_txt
+
+LEVEL_CACHE_VERSION: int = 1
+LEVEL_N_COLS: int = 40
+LEVEL_N_ROWS: int = 39
+
+
+def compiled_path(lvl_id: str) -> Path:
+    return MAPS_CACHE_PATH / f"{lvl_id}.npz"
+
+
+def source_key(lvl_txt_path: Path) -> tuple[int, int]:
+    stat = lvl_txt_path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def source_hash(lvl_txt_path: Path) -> str:
+    return hashlib.sha256(lvl_txt_path.read_bytes()).hexdigest()
+
+
+def compile_lvl(lvl_id: str) -> tuple[list[Brick], dict[str, np.ndarray]]:
+    """Parses a text map and computes everything a level start needs.
+
+    The collision sides are computed against the LeftEdge, TopEdge and RightEdge every Game is created with.
+
+    Returns:
+        tuple[list[Brick], dict[str, np.ndarray]]: The bricks, ready to be used, and the arrays of the compiled level.
+    """
+    lvl_txt_path = MAPS_PATH / lvl_id
+    bricks = create_bricks_from_lvl_txt(lvl_id)
+    store = BrickStore(bricks)
+    update_enabled_collision_sides(bricks, [LeftEdge(), TopEdge(), RightEdge()])
+
+    # Symbol of each brick at the cell of its top left corner, 0 elsewhere. Bricks are created in row major order so
+    # np.nonzero of the grid gives them back in the same order.
+    types = np.zeros((LEVEL_N_ROWS, LEVEL_N_COLS), dtype=np.uint8)
+    for brick in bricks:
+        types[brick.rect.top // GRID_DY, brick.rect.left // GRID_DX] = ord(brick.symbol)
+
+    # Neighbors as ranges of neighbor_ids, brick i has neighbor_ids[neighbor_offsets[i] : neighbor_offsets[i + 1]]
+    index = {id(brick): i for i, brick in enumerate(bricks)}
+    neighbor_ids = np.array([index[id(n)] for brick in bricks for n in brick.neighbors], dtype=np.int32)
+    neighbor_offsets = np.cumsum([0] + [len(brick.neighbors) for brick in bricks], dtype=np.int32)
+
+    mtime_ns, size = source_key(lvl_txt_path)
+    arrays = {
+        "version": np.array(LEVEL_CACHE_VERSION),
+        "source_mtime_ns": np.array(mtime_ns, dtype=np.int64),
+        "source_size": np.array(size, dtype=np.int64),
+        "source_hash": np.array(source_hash(lvl_txt_path)),
+        "types": types,
+        "neighbor_offsets": neighbor_offsets,
+        "neighbor_ids": neighbor_ids,
+        "side_masks": store.side_mask.copy(),
+    }
+    return bricks, arrays
+
+
+def save_compiled_lvl(lvl_id: str, arrays: dict[str, np.ndarray]) -> None:
+    path = compiled_path(lvl_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename so a crash never leaves half a file behind. Every process and thread writes
+    # its own temporary file, writers compiling the same level at once each rename a whole one.
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+    try:
+        np.savez(tmp_path, **arrays)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(path)
+
+
+def load_compiled_lvl(lvl_id: str) -> dict[str, np.ndarray] | None:
+    """Arrays of the compiled level, None if there are none or they are stale"""
+    path = compiled_path(lvl_id)
+    lvl_txt_path = MAPS_PATH / lvl_id
+    if not path.exists():
+        return None
+
+    try:
+        with np.load(path) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+
+        if int(arrays["version"]) != LEVEL_CACHE_VERSION:
+            return None
+        touched = (int(arrays["source_mtime_ns"]), int(arrays["source_size"])) != source_key(lvl_txt_path)
+        # Touched but possibly unchanged, e.g. after a checkout
+        if touched and str(arrays["source_hash"]) != source_hash(lvl_txt_path):
+            return None
+    except (KeyError, OSError, ValueError, EOFError, zipfile.BadZipFile):
+        return None
+
+    return arrays
+
+
+def create_bricks_from_compiled(arrays: dict[str, np.ndarray]) -> list[Brick]:
+    rows, cols = np.nonzero(arrays["types"])
+    bricks: list[Brick] = []
+    for row, col, symbol in zip(rows.tolist(), cols.tolist(), arrays["types"][rows, cols].tolist()):
+        bt = bricks_dict[chr(symbol)]
+        assert bt is not None
+        bricks.append(create_brick(bt, col, row))
+
+    offsets = arrays["neighbor_offsets"].tolist()
+    neighbor_ids = arrays["neighbor_ids"].tolist()
+    for i, (brick, mask) in enumerate(zip(bricks, arrays["side_masks"].tolist())):
+        brick.neighbors = [bricks[j] for j in neighbor_ids[offsets[i] : offsets[i + 1]]]
+        brick.enabled_collision_sides = mask
+
+    return bricks
+
+
+def load_bricks(lvl_id: str) -> list[Brick]:
+    """Bricks of a level with their neighbors and collision sides set, compiling the level if the cache is stale"""
+    if (arrays := load_compiled_lvl(lvl_id)) is not None:
+        return create_bricks_from_compiled(arrays)
+
+    bricks, arrays = compile_lvl(lvl_id)
+    try:
+        save_compiled_lvl(lvl_id, arrays)
+    except OSError as e:
+        print(f"Could not cache compiled level {lvl_id}: {e}")
+    return bricks
+
+
+if __name__ == "__main__":
+    for lvl_txt_path in sorted(MAPS_PATH.glob("*.txt")):
+        _, arrays = compile_lvl(lvl_txt_path.name)
+        save_compiled_lvl(lvl_txt_path.name, arrays)
+        num_bricks = int(np.count_nonzero(arrays["types"]))
+        print(f"{lvl_txt_path.name}: {num_bricks} bricks -> {compiled_path(lvl_txt_path.name)}")
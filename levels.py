@@ -0,0 +1,57 @@
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from constants import LEVELS
+from entities import Brick, BrickLayer, BrickStore
+from level_cache import load_bricks
+
+
+@dataclass
+class Level:
+    """Everything a level needs before it can be played, bricks with their collision data and rendered layer"""
+
+    lvl_id: str
+    bricks: list[Brick]
+    brick_store: BrickStore
+    brick_layer: BrickLayer
+
+
+def load_level(lvl_id: str) -> Level:
+    bricks = load_bricks(lvl_id)
+    return Level(lvl_id, bricks, BrickStore(bricks), BrickLayer(bricks))
+
+
+class LevelManager:
+    """Loads levels ahead of time on a background thread.
+
+    prefetch starts loading a level while the current one is played, take hands it over, waiting for it if it is not
+    done yet or loading it right away if it was never prefetched. A Level is played once, take always returns a new
+    one. With background False nothing is prefetched, take loads every level when it is asked for.
+    """
+
+    def __init__(self, lvl_ids: Sequence[str] = LEVELS, background: bool = True) -> None:
+        self.lvl_ids: list[str] = list(lvl_ids)
+        self.background: bool = background
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level_prefetch")
+        self.pending: dict[str, Future[Level]] = {}
+
+    def next_lvl_id(self, lvl_id: str) -> str:
+        """Level after lvl_id, wrapping around after the last one"""
+        if lvl_id not in self.lvl_ids:
+            return self.lvl_ids[0]
+        return self.lvl_ids[(self.lvl_ids.index(lvl_id) + 1) % len(self.lvl_ids)]
+
+    def prefetch(self, lvl_id: str) -> None:
+        if self.background and lvl_id not in self.pending:
+            self.pending[lvl_id] = self.executor.submit(load_level, lvl_id)
+
+    def take(self, lvl_id: str) -> Level:
+        future = self.pending.pop(lvl_id, None)
+        if future is None:
+            return load_level(lvl_id)
+        return future.result()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
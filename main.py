@@ -1,56 +1,125 @@
+from dataclasses import dataclass
+from itertools import chain
 from sys import exit
 from typing import NoReturn, Sequence
 
+import numpy as np
 import pygame as pg
 
 import globals
 from constants import (
+    BALL_TRAIL_FADE,
     COLORS,
-    FONT,
+    EDGE_WIDTH,
     FPS,
     GAME_FIELD_HEIGHT,
     GAME_FIELD_RECT_TO_SCREEN,
     GAME_FIELD_SURFACE,
     GAME_FIELD_WIDTH,
     PAUSE_OVERLAY,
+    PROFILER_CSV_PATH,
     RENDER_GRID_FLAG,
+    RENDER_INTERPOLATION,
+    RENDER_MODE,
+    REPLAY_RECORD_PATH,
+    REWIND_STEP_FRAMES,
     SCREEN,
     SHOW_FPS,
+    SHOW_PROFILER,
+    SIM_DT,
+    SIM_MAX_STEPS,
     UI_TEXT_SIZE,
+    RenderMode,
     States,
+    render_text,
 )
 from entities import (
     Ball,
     BallTrailComponent,
     Brick,
+    BrickLayer,
+    BrickStore,
+    ComponentRegistry,
     Edge,
     Entity,
+    EntityStore,
+    Hook,
     LeftEdge,
+    MovingEntity,
     Paddle,
     RightEdge,
     ScoreComponent,
     TopEdge,
-    on_delete_component_list,
-    on_render_component_list,
-    on_update_component_list,
+    TrailLayer,
     update_enabled_collision_sides,
 )
-from map import create_bricks_from_lvl_txt, render_grid, render_row_col_ids
+from levels import Level, LevelManager
+from map import render_grid, render_row_col_ids
+from profiler import FrameProfiler
+from renderer import DirtyRenderer
+from replay import InputRecorder
+from rewind import RewindBuffer
 
 globals.init_globals()
 
 
-def show_fps_cps(fps: float) -> None:
-    fps_text, _ = FONT.render(f"FPS: {int(fps)}", COLORS["YELLOW"], size=UI_TEXT_SIZE)
-    SCREEN.blit(fps_text, fps_text.get_rect(topleft=(0, 0)))
+def show_fps_cps(fps: float) -> pg.Rect:
+    fps_text = render_text(f"FPS: {int(fps)}", COLORS["YELLOW"], UI_TEXT_SIZE)
+    return SCREEN.blit(fps_text, fps_text.get_rect(topleft=(0, 0)))
+
+
+@dataclass
+class WorldSnapshot:
+    """State of a Game right after a level was set up, restored in place to restart the level"""
+
+    entities: tuple[list[list], dict[int, Entity], dict[int, int]]
+    components: tuple[dict[Hook, list], dict[Hook, dict[int, int]]]
+    ball_colliders: list[Entity]
+    brick_store: tuple[np.ndarray, np.ndarray, np.ndarray, list[int]]
+    brick_layer: pg.Surface
+    moving: list[tuple[MovingEntity, pg.Rect, pg.Vector2]]  # balls and paddle with their position and velocity
+    ball: Ball
+    score: int
 
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        lvl_id: str = "lvl1.txt",
+        profiler: FrameProfiler | None = None,
+        levels: LevelManager | None = None,
+        rewind: RewindBuffer | None = None,
+        advance_levels: bool = True,
+    ) -> None:
         self.state: States = States.GAME_RUNNING
+        self.advance_levels: bool = advance_levels  # start the next level once all bricks are gone
+        self.profiler: FrameProfiler = profiler if profiler is not None else FrameProfiler(enabled=False)
+        self.levels: LevelManager = levels if levels is not None else LevelManager()
+        self.rewind: RewindBuffer = rewind if rewind is not None else RewindBuffer()
 
         globals.reset_score()
 
+        # Live entities and their components, by category and by hook
+        self.entities: EntityStore = EntityStore()
+        self.components: ComponentRegistry = ComponentRegistry()
+
+        # Persistent views of the store, updated in place as entities are added and removed
+        self.balls: list[Ball] = self.entities.balls
+        self.bricks: list[Brick] = self.entities.bricks
+        self.edges: list[Edge] = self.entities.edges
+        self.ball_colliders: list[Entity] = []  # paddle and edges
+
+        # Lists reused by every frame of game_loop_logic
+        self.to_delete: list[Entity] = []
+        self.bricks_deleted: list[Brick] = []
+        self.bricks_to_check: list[Brick] = []
+        self.touched_bricks: list[Brick] = []  # bricks deleted or with changed sides since the snapshot
+
+        # Fixed timestep simulation
+        self.accumulator: float = 0  # ms not simulated yet
+        self.pending_events: list[pg.Event] = []  # input waiting for the next simulation step
+        self.unrendered_steps: int = 0  # simulation steps since the last render
+
         # Create paddle
         self.paddle: Paddle = Paddle(
             rect=pg.Rect(
@@ -60,47 +129,199 @@ class Game:
             vel=pg.Vector2(0, 0),
             color=COLORS["LIGHT_GREY"],
         )
+        self.add_entity(self.paddle)
 
         # Create ball
-        self.ball: Ball = Ball(
+        self.ball: Ball = self.add_ball(pg.Vector2(-1, -1))
+
+        # Create edges
+        for edge in [LeftEdge(), TopEdge(), RightEdge()]:
+            self.add_entity(edge)
+
+        # Create bricks, the next level is loaded in the background while this one is played
+        self.lvl_id: str = lvl_id
+        self.brick_store: BrickStore
+        self.brick_layer: BrickLayer
+        self.start_level(self.levels.take(lvl_id))
+
+        self.trail_layer: TrailLayer | None = TrailLayer() if BALL_TRAIL_FADE else None
+
+        self.snapshot: WorldSnapshot = self.take_snapshot()
+        self.rewind.reset(self)
+
+    def start_level(self, level: Level) -> None:
+        """Swaps in the bricks of a loaded level and prefetches the next level"""
+        while self.bricks:
+            self.remove_entity(self.bricks[-1])
+        for brick in level.bricks:
+            self.add_entity(brick)
+        self.brick_store = level.brick_store
+        self.brick_layer = level.brick_layer
+        self.lvl_id = level.lvl_id
+
+        self.levels.prefetch(self.levels.next_lvl_id(self.lvl_id))
+
+    def next_level(self) -> None:
+        """Starts the next level with a single ball back on the paddle"""
+        self.start_level(self.levels.take(self.levels.next_lvl_id(self.lvl_id)))
+
+        while self.balls:
+            self.remove_entity(self.balls[-1])
+        self.ball = self.add_ball(pg.Vector2(-1, -1))
+        self.snapshot = self.take_snapshot()
+        self.rewind.reset(self)
+
+    def take_snapshot(self) -> WorldSnapshot:
+        self.touched_bricks.clear()
+        return WorldSnapshot(
+            entities=self.entities.snapshot(),
+            components=self.components.snapshot(),
+            ball_colliders=list(self.ball_colliders),
+            brick_store=self.brick_store.snapshot(),
+            brick_layer=self.brick_layer.snapshot(),
+            moving=[
+                (entity, entity.rect.copy(), entity.vel.copy()) for entity in chain(self.balls, self.entities.paddles)
+            ],
+            ball=self.ball,
+            score=globals.score,
+        )
+
+    def restore(self, snapshot: WorldSnapshot) -> None:
+        """Puts the world back to a snapshot of the current level by copying its arrays and lists in place.
+
+        Only the bricks touched since the snapshot have their flags and collision sides reset, no entity is created.
+        """
+        self.entities.restore(snapshot.entities)
+        self.components.restore(snapshot.components)
+        self.ball_colliders[:] = snapshot.ball_colliders
+        self.brick_store.restore(snapshot.brick_store)
+        self.brick_layer.restore(snapshot.brick_layer)
+
+        side_masks = self.brick_store.side_mask
+        for brick in self.touched_bricks:
+            brick.to_be_deleted_flag = False
+            brick.enabled_collision_sides = int(side_masks[brick.store_id])
+        self.touched_bricks.clear()
+
+        for entity, rect, vel in snapshot.moving:
+            entity.rect.update(rect)
+            entity.prev_pos.update(rect.topleft)
+            entity.vel.update(vel)
+            entity.to_be_deleted_flag = False
+            for component in entity.components:
+                if isinstance(component, BallTrailComponent):
+                    component.clear()
+        self.ball = snapshot.ball
+        globals.score = snapshot.score
+
+        if self.trail_layer is not None:
+            self.trail_layer.surface.fill((0, 0, 0, 0))
+
+    def restart(self) -> None:
+        """Restarts the current level from its snapshot"""
+        self.restore(self.snapshot)
+        self.rewind.reset(self)
+        # Time and input left over from before the restart are not simulated
+        self.accumulator = 0
+        self.pending_events.clear()
+        self.state = States.GAME_RUNNING
+
+    def simulate(self, dt: float, events: Sequence[pg.Event], recorder: InputRecorder | None = None) -> int:
+        """Advances the simulation by dt in fixed steps of SIM_DT.
+
+        Time shorter than a step is kept for the next call. At most SIM_MAX_STEPS are simulated, the time a slow frame
+        can not catch up on is dropped so it does not make the next frame slower. events are handed to the first step
+        and kept for a later call when no step is due yet.
+
+        Returns:
+            int: Number of steps simulated.
+        """
+        self.pending_events.extend(events)
+        self.accumulator += dt
+
+        n_steps = 0
+        while self.accumulator >= SIM_DT and self.state == States.GAME_RUNNING:
+            if n_steps == SIM_MAX_STEPS:
+                self.accumulator %= SIM_DT
+                break
+            if recorder is not None:
+                recorder.record(self, SIM_DT, self.pending_events)
+            self.game_loop_logic(SIM_DT, self.pending_events)
+            self.pending_events.clear()
+            self.accumulator -= SIM_DT
+            n_steps += 1
+        return n_steps
+
+    def interpolation_alpha(self) -> float:
+        """Fraction of a step the rendered frame is ahead of the last simulation step"""
+        return self.accumulator / SIM_DT if RENDER_INTERPOLATION else 1.0
+
+    def add_entity(self, entity: Entity) -> None:
+        self.entities.add(entity)
+        self.components.register(entity.components)
+        if isinstance(entity, (Paddle, Edge)):
+            self.ball_colliders.append(entity)
+
+    def remove_entity(self, entity: Entity) -> None:
+        self.components.unregister(entity.components)
+        self.entities.remove(entity)
+        if isinstance(entity, (Paddle, Edge)):
+            self.ball_colliders.remove(entity)
+
+    def add_ball(self, vel: pg.Vector2) -> Ball:
+        ball = Ball(
             rect=pg.Rect(
                 (0, 0),
                 pg.Vector2(15, 15),
             ).move_to(midbottom=self.paddle.rect.midtop),
-            vel=pg.Vector2(-1, -1),
+            vel=vel,
             color=COLORS["WHITE"],
             components=[BallTrailComponent(2000, COLORS["WHITE"])],
         )
-        self.balls: list[Ball] = [self.ball]
+        self.add_entity(ball)
+        return ball
 
-        # Create bricks
-        self.bricks: list[Brick] = create_bricks_from_lvl_txt("lvl1.txt")
+    def render_all_entities(self, alpha: float = 1.0) -> None:
+        self.brick_layer.render()
 
-        # Create edges
-        self.edges: list[Edge] = [
-            LeftEdge(),
-            TopEdge(),
-            RightEdge(),
-        ]
+        for edge in self.edges:
+            edge.render()
 
-        for brick in self.bricks:
-            brick.update_neighbors(self.bricks)
+        self.render_moving_entities(alpha)
 
-        update_enabled_collision_sides(self.bricks, self.edges)
+        SCREEN.blit(GAME_FIELD_SURFACE, GAME_FIELD_RECT_TO_SCREEN)
 
-    def get_all_entities(self) -> Sequence[Entity]:
-        return self.edges + self.bricks + self.balls + [self.paddle]
+    def render_moving_entities(self, alpha: float = 1.0) -> list[pg.Rect | None]:
+        """Renders the balls, the paddle and their components to GAME_FIELD_SURFACE
 
-    def render_all_entities(self) -> None:
-        for entity in self.get_all_entities():
-            entity.render()
+        Args:
+            alpha (float, optional): Where to draw the entities between their positions before and after the last
+                simulation step. Defaults to 1.0, their current position.
 
-            for component in [c for c in entity.components if type(c) in on_render_component_list]:
+        Returns:
+            list[pg.Rect | None]: Areas drawn on.
+        """
+        if self.trail_layer is not None:
+            self.trail_layer.fade(self.unrendered_steps)
+        self.unrendered_steps = 0
+
+        rects: list[pg.Rect | None] = []
+        for entity in chain(self.balls, self.entities.paddles):
+            rect = entity.rect if alpha == 1.0 else entity.interpolated_rect(alpha)
+            entity.render(rect=rect)
+            rects.append(entity.render_rect(rect))
+
+            for component in entity.component_hooks[Hook.RENDER]:
                 match component:
+                    case BallTrailComponent() if self.trail_layer is not None:
+                        self.trail_layer.draw(component)
                     case BallTrailComponent():
-                        component.render()
+                        rects.append(component.render(head=rect.center if rect is not entity.rect else None))
 
-        SCREEN.blit(GAME_FIELD_SURFACE, GAME_FIELD_RECT_TO_SCREEN)
+        if self.trail_layer is not None:
+            rects.append(self.trail_layer.render())
+
+        return rects
 
     def handle_pause_quit_restart(self, key, event_type) -> None:
         if event_type == pg.KEYDOWN:
@@ -112,57 +333,110 @@ class Game:
                 self.state = States.GAME_RUNNING
             elif key == pg.K_p and self.state == States.GAME_RUNNING:
                 self.state = States.GAME_PAUSED
+            elif key == pg.K_BACKSPACE:
+                self.rewind.step(self, -REWIND_STEP_FRAMES)
+            elif key in (pg.K_COMMA, pg.K_PERIOD) and self.state == States.GAME_PAUSED:
+                self.rewind.step(self, -1 if key == pg.K_COMMA else 1)
 
-    def game_loop_logic(self, dt: float) -> None:
+    def game_loop_logic(self, dt: float, events: Sequence[pg.Event] | None = None) -> None:
         # Reset variables
-        bricks_to_check: list[Brick] = []
+        self.bricks_to_check.clear()
+        self.bricks_deleted.clear()
 
         # Handle input
-        for event in pg.event.get():
+        for event in pg.event.get() if events is None else events:
             match event.dict:
                 case {"key": key} if event.type in [pg.KEYDOWN, pg.KEYUP]:
                     self.handle_pause_quit_restart(key, event.type)
                     self.paddle.handle_keyboard_input(key, event.type)
+        self.profiler.mark("events")
+
+        # Do move and collide, from where the moving entities are drawn when interpolating
+        for entity in chain(self.balls, self.entities.paddles):
+            entity.prev_pos.update(entity.rect.topleft)
+        self.paddle.move_and_collide(dt, ())
+        self.profiler.mark("paddle")
 
-        # Do move and collide
-        self.paddle.move_and_collide(dt, [])
+        for ball in self.balls:
+            ball.move_and_collide(dt, self.ball_colliders, self.brick_store)
+        self.profiler.mark("balls")
 
-        others = [self.paddle] + self.bricks + self.edges
+        # Do deletion, only balls and bricks can be flagged and the brick store keeps track of the killed bricks
         for ball in self.balls:
-            ball.move_and_collide(dt, others)
+            if ball.to_be_deleted_flag:
+                self.to_delete.append(ball)
+        self.to_delete.extend(self.brick_store.killed)
+        self.brick_store.killed.clear()
 
-        # Do deletion
-        for entity in [e for e in self.get_all_entities() if e.to_be_deleted_flag]:
-            for component in [c for c in entity.components if type(c) in on_delete_component_list]:
+        for entity in self.to_delete:
+            for component in entity.component_hooks[Hook.DELETE]:
                 match component:
                     case ScoreComponent():
                         component.on_death()
+            self.remove_entity(entity)
 
             match entity:
                 case Brick():
-                    bricks_to_check.extend(entity.neighbors)
-                    self.bricks.remove(entity)
+                    self.bricks_deleted.append(entity)
+                    self.bricks_to_check.extend(entity.neighbors)
+                    self.brick_store.remove(entity)
                 case Ball():
-                    self.balls.remove(entity)
                     if len(self.balls) < 1:
                         # TODO: Reduce life:
                         ...
+        self.to_delete.clear()
+        self.profiler.mark("deletion")
 
         # Update variables
-        update_enabled_collision_sides(bricks_to_check, self.edges)
-        for entity in [e for e in self.get_all_entities()]:
-            for component in [c for c in entity.components if type(c) in on_update_component_list]:
-                match component:
-                    case BallTrailComponent():
-                        component.update()
+        update_enabled_collision_sides(self.bricks_to_check, self.edges)
+        self.brick_layer.update(chain(self.bricks_deleted, self.bricks_to_check))
+        self.touched_bricks.extend(chain(self.bricks_deleted, self.bricks_to_check))
+        self.profiler.mark("collision_sides")
+
+        if not self.bricks and self.advance_levels:
+            self.next_level()
+
+        for component in self.components[Hook.UPDATE]:
+            match component:
+                case BallTrailComponent():
+                    component.update()
+        self.profiler.mark("components")
+
+        self.rewind.record(self)
+        self.profiler.mark("rewind")
+        self.unrendered_steps += 1
+
+    def game_loop_render(self, alpha: float = 1.0) -> None:
+        self.render_all_entities(alpha)
+        self.profiler.mark("render_entities")
 
-    def game_loop_render(self) -> None:
-        self.render_all_entities()
         globals.render_score()
+        self.profiler.mark("render_score")
+
+    def game_loop_render_dirty(
+        self, renderer: DirtyRenderer, alpha: float = 1.0
+    ) -> tuple[list[pg.Rect | None], list[pg.Rect | None]]:
+        """Renders the frame on top of the previous one, only drawing what changed
+
+        Args:
+            renderer (DirtyRenderer): Keeps track of the areas drawn on in the previous frame.
+            alpha (float, optional): See render_moving_entities. Defaults to 1.0.
+
+        Returns:
+            tuple[list[pg.Rect | None], list[pg.Rect | None]]: Areas drawn on in GAME_FIELD_SURFACE and in SCREEN.
+        """
+        renderer.begin_frame(self.brick_layer, self.edges)
+        field_rects = self.render_moving_entities(alpha)
+        self.profiler.mark("render_entities")
+
+        screen_rects: list[pg.Rect | None] = [globals.render_score()]
+        self.profiler.mark("render_score")
+
+        return field_rects, screen_rects
 
-    def paused_loop_logic(self) -> None:
+    def paused_loop_logic(self, events: Sequence[pg.Event] | None = None) -> None:
         # Handle input
-        for event in pg.event.get():
+        for event in pg.event.get() if events is None else events:
             match event.dict:
                 case {"key": key} if event.type in [pg.KEYDOWN, pg.KEYUP]:
                     self.handle_pause_quit_restart(key, event.type)
@@ -174,6 +448,8 @@ class Game:
 
     def exiting(self) -> None:
         print("Exiting")
+        self.profiler.close()
+        self.levels.shutdown()
         exit(0)
 
 
@@ -181,61 +457,103 @@ def main() -> NoReturn:
     # pygame setup
     pg.init()
     CLOCK: pg.Clock = pg.time.Clock()
+    profiler = FrameProfiler(csv_path=PROFILER_CSV_PATH, enabled=SHOW_PROFILER or PROFILER_CSV_PATH is not None)
+    renderer = DirtyRenderer()
 
-    game = Game()
+    game = Game(profiler=profiler)
+    recorder: InputRecorder | None = None
+    if REPLAY_RECORD_PATH is not None:
+        recorder = InputRecorder(REPLAY_RECORD_PATH, game.lvl_id, game.levels.lvl_ids)
     dt: int = 0  # ms
 
     while True:
-        if pg.event.peek(pg.QUIT):
+        profiler.start_frame()
+
+        events = pg.event.get()
+        if any(event.type == pg.QUIT for event in events):
             game.state = States.EXITING
 
+        # Running frames are recorded per simulation step
+        if recorder is not None and game.state != States.GAME_RUNNING:
+            recorder.record(game, dt, events)
+
         # Update loop
         match game.state:
             case States.MAIN_MENU_SCREEN:
                 pass
             case States.GAME_RUNNING:
-                game.game_loop_logic(dt)
+                game.simulate(dt, events, recorder)
             case States.GAME_PAUSED:
-                game.paused_loop_logic()
+                game.paused_loop_logic(events)
             case States.GAME_OVER_SCREEN:
                 pass
             case States.EXITING:
+                if recorder is not None:
+                    recorder.close()
                 game.exiting()
             case States.RESTART:
-                game = Game()
+                game.restart()
                 dt: int = 0
                 continue
 
         # Render
-        # Clear screen
-        SCREEN.fill(COLORS["BLACK"])
-        GAME_FIELD_SURFACE.fill(COLORS["DARK_GREY"])
-
-        if RENDER_GRID_FLAG:
-            render_grid(20, 20)
-            render_row_col_ids(20, 20)
-
-        if SHOW_FPS:
-            show_fps_cps(CLOCK.get_fps())
-
-        match game.state:
-            case States.MAIN_MENU_SCREEN:
-                pass
-            case States.GAME_RUNNING:
-                game.game_loop_render()
-            case States.GAME_PAUSED:
-                game.paused_loop_render()
-            case States.GAME_OVER_SCREEN:
-                pass
-            case States.EXITING:
-                game.exiting()
-            case States.RESTART:
-                game = Game()
-                dt: int = 0
-                continue
-
-        # Update the screen
-        pg.display.flip()
+        if RENDER_MODE == RenderMode.DIRTY and game.state == States.GAME_RUNNING:
+            field_rects, screen_rects = game.game_loop_render_dirty(renderer, game.interpolation_alpha())
+
+            if SHOW_FPS:
+                screen_rects.append(show_fps_cps(CLOCK.get_fps()))
+
+            if SHOW_PROFILER:
+                screen_rects.append(
+                    profiler.render(SCREEN, GAME_FIELD_RECT_TO_SCREEN.topright + pg.Vector2(EDGE_WIDTH + 10, 60))
+                )
+            profiler.mark("other")
+
+            # Update the changed areas of the screen
+            pg.display.update(renderer.end_frame(field_rects, screen_rects))
+        else:
+            renderer.invalidate()
+
+            # Clear screen
+            SCREEN.fill(COLORS["BLACK"])
+            GAME_FIELD_SURFACE.fill(COLORS["DARK_GREY"])
+
+            if RENDER_GRID_FLAG:
+                render_grid(20, 20)
+                render_row_col_ids(20, 20)
+
+            if SHOW_FPS:
+                show_fps_cps(CLOCK.get_fps())
+
+            profiler.mark("other")
+
+            match game.state:
+                case States.MAIN_MENU_SCREEN:
+                    pass
+                case States.GAME_RUNNING:
+                    game.game_loop_render(game.interpolation_alpha())
+                case States.GAME_PAUSED:
+                    game.paused_loop_render()
+                case States.GAME_OVER_SCREEN:
+                    pass
+                case States.EXITING:
+                    if recorder is not None:
+                        recorder.close()
+                    game.exiting()
+                case States.RESTART:
+                    game.restart()
+                    dt: int = 0
+                    continue
+
+            if SHOW_PROFILER:
+                profiler.render(SCREEN, GAME_FIELD_RECT_TO_SCREEN.topright + pg.Vector2(EDGE_WIDTH + 10, 60))
+                profiler.mark("other")
+
+            # Update the screen
+            pg.display.flip()
+
+        profiler.mark("flip")
+        profiler.end_frame()
 
         # Update the clock
         dt: int = CLOCK.tick(FPS)
@@ -1,11 +1,11 @@
+from functools import lru_cache
+
 import pygame as pg
 
 from constants import (
     FONT,
-    GAME_FIELD_HEIGHT,
     GAME_FIELD_RECT_TO_SCREEN,
     GAME_FIELD_SURFACE,
-    GAME_FIELD_WIDTH,
     COLORS,
     GRID_DX,
     GRID_DY,
@@ -45,10 +45,20 @@ def load_lvl_txt_to_list(lvl_id: str) -> list[str]:
     return lvl_list
 
 
+def create_brick(bt: type[Brick], col: int, row: int) -> Brick:
+    return bt(
+        rect=pg.rect.Rect((GRID_DX * col, GRID_DY * row), (bt.width, bt.height)),
+        color=COLORS["LIGHT_GREY"],
+    )
+
+
 def create_bricks_from_lvl_txt(lvl_id: str) -> list[Brick]:
+    """Creates the bricks of a level with their neighbors already set"""
     lvl_list = load_lvl_txt_to_list(lvl_id)
 
     bricks: list[Brick] = []
+    # (col, row) -> index in bricks of the brick covering the cell
+    cell_index: dict[tuple[int, int], int] = {}
 
     for row, lvl_row in enumerate(lvl_list):
         skip_cols: int = 0
@@ -61,40 +71,81 @@ def create_bricks_from_lvl_txt(lvl_id: str) -> list[Brick]:
                 case None:
                     continue
                 case _:
-                    bricks.append(
-                        bt(
-                            rect=pg.rect.Rect((GRID_DX * col, GRID_DY * row), (bt.width, bt.height)),
-                            color=COLORS["LIGHT_GREY"],
-                        ),
-                    )
+                    for c in range(col, col + bt.width // GRID_DX):
+                        for r in range(row, row + bt.height // GRID_DY):
+                            cell_index[(c, r)] = len(bricks)
+                    bricks.append(create_brick(bt, col, row))
                     skip_cols = bt.skip_cols()
 
+    link_brick_neighbors(bricks, cell_index)
+
     return bricks
 
 
-def render_grid(dx: int, dy: int) -> None:
-    for v_line in range(1, int(GAME_FIELD_WIDTH / dx) + 2):
-        pg.draw.line(GAME_FIELD_SURFACE, COLORS["LIGHT_GREY"], (dx * v_line, 0), (dx * v_line, GAME_FIELD_HEIGHT))
+def link_brick_neighbors(bricks: list[Brick], cell_index: dict[tuple[int, int], int]) -> None:
+    """Updates the neighbors of every brick, only considering the bricks in the ring of cells around it"""
+    for brick in bricks:
+        col0, row0 = brick.rect.left // GRID_DX, brick.rect.top // GRID_DY
+        candidates: set[int] = set()
+        for row in range(row0 - 1, row0 + brick.rect.height // GRID_DY + 1):
+            for col in range(col0 - 1, col0 + brick.rect.width // GRID_DX + 1):
+                if (i := cell_index.get((col, row))) is not None:
+                    candidates.add(i)
 
-    for h_line in range(1, int(GAME_FIELD_HEIGHT / dy) + 2):
-        pg.draw.line(GAME_FIELD_SURFACE, COLORS["LIGHT_GREY"], (0, h_line * dy), (GAME_FIELD_WIDTH, h_line * dy))
+        # Same order as when every brick is checked
+        brick.update_neighbors([bricks[i] for i in sorted(candidates)])
 
 
-def render_row_col_ids(dx: int, dy: int) -> None:
-    n_rows = int(GAME_FIELD_HEIGHT / dy)
+@lru_cache(maxsize=4)
+def create_grid_overlay(dx: int, dy: int, field_size: tuple[int, int]) -> pg.Surface:
+    field_width, field_height = field_size
+    overlay = pg.Surface(field_size)
+    overlay.fill(COLORS["COLORKEY"])
+    overlay.set_colorkey(COLORS["COLORKEY"])
+
+    for v_line in range(1, int(field_width / dx) + 2):
+        pg.draw.line(overlay, COLORS["LIGHT_GREY"], (dx * v_line, 0), (dx * v_line, field_height))
+
+    for h_line in range(1, int(field_height / dy) + 2):
+        pg.draw.line(overlay, COLORS["LIGHT_GREY"], (0, h_line * dy), (field_width, h_line * dy))
+
+    return overlay
+
+
+def create_label_strip(labels: list[tuple[pg.Surface, pg.Rect]]) -> tuple[pg.Surface, pg.Rect]:
+    """Blits labels into one transparent surface, returned with the rect it covers on SCREEN"""
+    area = labels[0][1].unionall([rect for _, rect in labels])
+    strip = pg.Surface(area.size, pg.SRCALPHA)
+    for text, rect in labels:
+        strip.blit(text, rect.move(-area.x, -area.y))
+    return strip, area
+
+
+@lru_cache(maxsize=4)
+def create_row_col_ids_overlay(
+    dx: int, dy: int, field_rect: tuple[int, int, int, int]
+) -> list[tuple[pg.Surface, pg.Rect]]:
+    """Row labels and column labels each rendered once into a strip, with the rect it is blitted to on SCREEN"""
+    field_rect_to_screen = pg.Rect(field_rect)
+
+    row_labels: list[tuple[pg.Surface, pg.Rect]] = []
+    n_rows = int(field_rect_to_screen.height / dy)
     for row_num in range(n_rows + 1):
         text, _ = FONT.render(f"{row_num}", COLORS["YELLOW"], size=ROW_COL_TEXT_SIZE)
-        SCREEN.blit(
-            text,
-            text.get_rect(
-                midright=(
-                    GAME_FIELD_RECT_TO_SCREEN.left,
-                    GAME_FIELD_RECT_TO_SCREEN.top + dy * (n_rows - row_num) + dy / 2,
-                )
-            ),
+        row_labels.append(
+            (
+                text,
+                text.get_rect(
+                    midright=(
+                        field_rect_to_screen.left,
+                        field_rect_to_screen.top + dy * (n_rows - row_num) + dy / 2,
+                    )
+                ),
+            )
         )
 
-    n_cols = int(GAME_FIELD_WIDTH / dx)
+    col_labels: list[tuple[pg.Surface, pg.Rect]] = []
+    n_cols = int(field_rect_to_screen.width / dx)
     for col_num in range(n_cols):
         if col_num < 26:
             chr_number = 97 + col_num
@@ -102,16 +153,28 @@ def render_row_col_ids(dx: int, dy: int) -> None:
             chr_number = 65 + (col_num - 26)
 
         text, _ = FONT.render(f"{chr(chr_number)}", COLORS["YELLOW"], size=ROW_COL_TEXT_SIZE)
-        SCREEN.blit(
-            text,
-            text.get_rect(
-                midbottom=(
-                    GAME_FIELD_RECT_TO_SCREEN.left + dx * (col_num) + dx / 2,
-                    GAME_FIELD_RECT_TO_SCREEN.top,
-                )
-            ),
+        col_labels.append(
+            (
+                text,
+                text.get_rect(
+                    midbottom=(
+                        field_rect_to_screen.left + dx * (col_num) + dx / 2,
+                        field_rect_to_screen.top,
+                    )
+                ),
+            )
         )
 
+    return [create_label_strip(row_labels), create_label_strip(col_labels)]
+
+
+def render_grid(dx: int, dy: int) -> None:
+    GAME_FIELD_SURFACE.blit(create_grid_overlay(dx, dy, GAME_FIELD_SURFACE.get_size()), (0, 0))
+
+
+def render_row_col_ids(dx: int, dy: int) -> None:
+    SCREEN.fblits(create_row_col_ids_overlay(dx, dy, tuple(GAME_FIELD_RECT_TO_SCREEN)))
+
 
 if __name__ == "__main__":
     lvl_txt = load_lvl_txt_to_list("lvl1.txt")
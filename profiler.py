@@ -0,0 +1,143 @@
+import csv
+from pathlib import Path
+from time import perf_counter
+from typing import TextIO
+
+import numpy as np
+import pygame as pg
+
+from constants import COLORS, FONT, FPS, ROW_COL_TEXT_SIZE
+
+# Phases of a frame in the order they are stacked in the graph
+PROFILER_PHASES: list[str] = [
+    "events",
+    "paddle",
+    "balls",
+    "deletion",
+    "collision_sides",
+    "components",
+    "rewind",
+    "render_entities",
+    "render_score",
+    "flip",
+    "other",
+]
+PROFILER_COLORS: dict[str, pg.typing.ColorLike] = {
+    "events": (230, 25, 75),
+    "paddle": (245, 130, 48),
+    "balls": (255, 225, 25),
+    "deletion": (210, 245, 60),
+    "collision_sides": (60, 180, 75),
+    "components": (70, 240, 240),
+    "rewind": (250, 190, 212),
+    "render_entities": (0, 130, 200),
+    "render_score": (145, 30, 180),
+    "flip": (240, 50, 230),
+    "other": (128, 128, 128),
+}
+
+PROFILER_WINDOW: int = 180  # frames kept in the rolling window, one pixel column each in the graph
+PROFILER_GRAPH_HEIGHT: int = 100  # pix
+PROFILER_GRAPH_MS: float = 2 * 1000 / FPS  # ms at the top of the graph
+
+
+class FrameProfiler:
+    """Times each phase of a frame and keeps the last PROFILER_WINDOW frames.
+
+    Call start_frame at the start of a frame, mark(phase) right after a phase is done and end_frame when the frame is
+    over. The time since the previous mark is added to the phase, time after the last mark is added to "other".
+    """
+
+    def __init__(self, csv_path: Path | None = None, enabled: bool = True) -> None:
+        self.enabled: bool = enabled
+        self.phase_index: dict[str, int] = {phase: i for i, phase in enumerate(PROFILER_PHASES)}
+        self.times: np.ndarray = np.zeros((PROFILER_WINDOW, len(PROFILER_PHASES)))  # ms
+        self.frame: int = 0
+
+        self.current: list[float] = [0.0] * len(PROFILER_PHASES)
+        self.t_last: float = perf_counter()
+
+        self.csv_file: TextIO | None = None
+        if enabled and csv_path is not None:
+            self.csv_file = csv_path.open("w", newline="", encoding="utf8")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame", *PROFILER_PHASES])
+
+        self.graph: pg.Surface | None = None
+        self.legend: pg.Surface | None = None
+
+    def start_frame(self) -> None:
+        self.current = [0.0] * len(PROFILER_PHASES)
+        self.t_last = perf_counter()
+
+    def mark(self, phase: str) -> None:
+        if not self.enabled:
+            return
+        t = perf_counter()
+        self.current[self.phase_index[phase]] += (t - self.t_last) * 1e3
+        self.t_last = t
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+        self.mark("other")
+
+        self.times[self.frame % PROFILER_WINDOW] = self.current
+        if self.csv_file is not None:
+            self.csv_writer.writerow([self.frame, *(f"{t:.4f}" for t in self.current)])
+        if self.graph is not None:
+            self.draw_graph_column()
+
+        self.frame += 1
+
+    def mean(self) -> dict[str, float]:
+        """Mean ms of each phase over the rolling window"""
+        n = min(self.frame, PROFILER_WINDOW)
+        if n == 0:
+            return dict.fromkeys(PROFILER_PHASES, 0.0)
+        return dict(zip(PROFILER_PHASES, self.times[:n].mean(axis=0).tolist()))
+
+    def close(self) -> None:
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+
+    def draw_graph_column(self) -> None:
+        """Scrolls the graph one pixel left and draws the stacked bar of the last frame in the freed column"""
+        assert self.graph is not None
+        self.graph.scroll(-1, 0)
+        x = PROFILER_WINDOW - 1
+        pg.draw.line(self.graph, COLORS["BLACK"], (x, 0), (x, PROFILER_GRAPH_HEIGHT))
+
+        y = float(PROFILER_GRAPH_HEIGHT)
+        for phase, ms in zip(PROFILER_PHASES, self.current):
+            height = ms / PROFILER_GRAPH_MS * PROFILER_GRAPH_HEIGHT
+            if height >= 0.5:
+                pg.draw.line(self.graph, PROFILER_COLORS[phase], (x, y), (x, y - height))
+            y -= height
+
+        # Frame budget line
+        y_budget = PROFILER_GRAPH_HEIGHT - (1000 / FPS) / PROFILER_GRAPH_MS * PROFILER_GRAPH_HEIGHT
+        self.graph.set_at((x, int(y_budget)), COLORS["WHITE"])
+
+    def create_overlay(self) -> None:
+        self.graph = pg.Surface((PROFILER_WINDOW, PROFILER_GRAPH_HEIGHT))
+        self.graph.fill(COLORS["BLACK"])
+
+        line_height = ROW_COL_TEXT_SIZE + 2
+        self.legend = pg.Surface((PROFILER_WINDOW, line_height * len(PROFILER_PHASES)), pg.SRCALPHA)
+        for i, phase in enumerate(PROFILER_PHASES):
+            pg.draw.rect(self.legend, PROFILER_COLORS[phase], (0, i * line_height + 1, 8, 8))
+            text, _ = FONT.render(phase, COLORS["LIGHT_GREY"], size=ROW_COL_TEXT_SIZE)
+            self.legend.blit(text, (12, i * line_height))
+
+    def render(self, surface: pg.Surface, topleft: pg.typing.Point) -> pg.Rect | None:
+        if not self.enabled:
+            return None
+        if self.graph is None or self.legend is None:
+            self.create_overlay()
+            assert self.graph is not None and self.legend is not None
+
+        graph_rect = surface.blit(self.graph, topleft)
+        legend_rect = surface.blit(self.legend, graph_rect.bottomleft + pg.Vector2(0, 5))
+        return graph_rect.union(legend_rect)
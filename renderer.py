@@ -0,0 +1,102 @@
+from collections.abc import Sequence
+
+import pygame as pg
+
+from constants import COLORS, GAME_FIELD_RECT_TO_SCREEN, GAME_FIELD_SURFACE, RENDER_GRID_FLAG, SCREEN
+from entities import BrickLayer, Edge
+from map import render_grid, render_row_col_ids
+
+
+class DirtyRenderer:
+    """Redraws only the areas of the screen that changed since the last frame.
+
+    The static parts of the screen (background, grid, labels and edges) are rendered once into background surfaces.
+    Every frame the areas drawn on by moving entities and the HUD in the previous frame, and the areas of changed
+    bricks, are restored from the backgrounds and the brick layer before drawing the new frame on top. Only the union
+    of old and new areas needs to be passed to pg.display.update.
+    """
+
+    def __init__(self) -> None:
+        self.screen_background: pg.Surface | None = None
+        self.field_background: pg.Surface | None = None
+        self.brick_layer: BrickLayer | None = None
+
+        # Areas drawn on in the previous frame
+        self.field_rects: list[pg.Rect] = []
+        self.screen_rects: list[pg.Rect] = []
+        self.full_redraw: bool = True
+
+    def invalidate(self) -> None:
+        """Redraw everything next frame, call after the screen was drawn by something else"""
+        self.full_redraw = True
+
+    def create_backgrounds(self, edges: Sequence[Edge]) -> None:
+        SCREEN.fill(COLORS["BLACK"])
+        GAME_FIELD_SURFACE.fill(COLORS["DARK_GREY"])
+
+        if RENDER_GRID_FLAG:
+            render_grid(20, 20)
+            render_row_col_ids(20, 20)
+
+        for edge in edges:
+            edge.render()
+
+        self.screen_background = SCREEN.copy()
+        self.field_background = GAME_FIELD_SURFACE.copy()
+
+    def begin_frame(self, brick_layer: BrickLayer, edges: Sequence[Edge]) -> None:
+        """Restores the areas drawn on in the previous frame and the areas of changed bricks"""
+        if self.screen_background is None or self.field_background is None:
+            self.create_backgrounds(edges)
+            assert self.screen_background is not None and self.field_background is not None
+
+        if self.brick_layer is not brick_layer:
+            self.brick_layer = brick_layer
+            self.full_redraw = True
+
+        if self.full_redraw:
+            SCREEN.blit(self.screen_background, (0, 0))
+            GAME_FIELD_SURFACE.blit(self.field_background, (0, 0))
+            brick_layer.render()
+            return
+
+        self.field_rects.extend(brick_layer.dirty_rects)
+        brick_layer.dirty_rects.clear()
+
+        for rect in self.field_rects:
+            GAME_FIELD_SURFACE.blit(self.field_background, rect, rect)
+            brick_layer.render_area(rect)
+
+        for rect in self.screen_rects:
+            SCREEN.blit(self.screen_background, rect, rect)
+
+    def end_frame(self, field_rects: Sequence[pg.Rect | None], screen_rects: Sequence[pg.Rect | None]) -> list[pg.Rect]:
+        """Copies the changed areas of the game field to the screen and returns the screen areas to update
+
+        Args:
+            field_rects (Sequence[pg.Rect | None]): Areas of GAME_FIELD_SURFACE drawn on this frame.
+            screen_rects (Sequence[pg.Rect | None]): Areas of SCREEN drawn on this frame, outside the game field.
+
+        Returns:
+            list[pg.Rect]: Areas of SCREEN to pass to pg.display.update.
+        """
+        new_field_rects = [r for r in field_rects if r is not None]
+        new_screen_rects = [r for r in screen_rects if r is not None]
+
+        if self.full_redraw:
+            SCREEN.blit(GAME_FIELD_SURFACE, GAME_FIELD_RECT_TO_SCREEN)
+            update_rects = [SCREEN.get_rect()]
+            self.full_redraw = False
+        else:
+            update_rects = []
+            for rect in self.field_rects + new_field_rects:
+                screen_rect = SCREEN.blit(
+                    GAME_FIELD_SURFACE, GAME_FIELD_RECT_TO_SCREEN.topleft + pg.Vector2(rect.topleft), rect
+                )
+                update_rects.append(screen_rect)
+            update_rects.extend(self.screen_rects)
+            update_rects.extend(new_screen_rects)
+
+        self.field_rects = new_field_rects
+        self.screen_rects = new_screen_rects
+        return update_rects
@@ -0,0 +1,182 @@
+"""Binary input logs to replay a game frame by frame.
+
+A log starts with a header holding the level the game started on and the level ids of its LevelManager, then holds
+one record per iteration of the main loop: the state of the game, the dt passed to the logic and the key events of the
+frame. Every REPLAY_CHECKSUM_INTERVAL frames, and on the last one, the record ends with a crc32 of the world so a
+replay can tell where it went out of sync.
+
+record a game by setting REPLAY_RECORD_PATH in constants.py, replay it without a window as fast as possible using
+
+    uv run headless.py --replay game.replay
+"""
+
+import struct
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+import numpy as np
+import pygame as pg
+
+import globals
+from constants import REPLAY_CHECKSUM_INTERVAL, States
+from rewind import moving_states
+
+if TYPE_CHECKING:
+    from main import Game
+
+REPLAY_MAGIC: bytes = b"MBRP"
+REPLAY_VERSION: int = 1
+
+HEADER = struct.Struct("<4sHHB")  # magic, version, checksum interval, number of level ids that follow
+LVL_ID = struct.Struct("<B")  # length of the utf8 level id that follows
+FRAME = struct.Struct("<BdB")  # state, dt in ms, number of key events
+KEY_EVENT = struct.Struct("<Bi")  # 0 for KEYDOWN and 1 for KEYUP, key
+CHECKSUM = struct.Struct("<I")
+
+KEY_EVENT_TYPES: list[int] = [pg.KEYDOWN, pg.KEYUP]
+
+
+class ReplayReadError(ValueError): ...
+
+
+class ReplayDesyncError(RuntimeError): ...
+
+
+def world_checksum(game: "Game") -> int:
+    """crc32 of everything the simulation depends on, the bricks, balls, paddle and score"""
+    store = game.brick_store
+    checksum = zlib.crc32(store.health.tobytes())
+    checksum = zlib.crc32(store.side_mask.tobytes(), checksum)
+    checksum = zlib.crc32(store.alive.tobytes(), checksum)
+    checksum = zlib.crc32(moving_states(game).tobytes(), checksum)
+    return zlib.crc32(np.int64(globals.score).tobytes(), checksum)
+
+
+def has_checksum(i: int, state: States, checksum_interval: int) -> bool:
+    return i % checksum_interval == 0 or state == States.EXITING
+
+
+@dataclass
+class ReplayFrame:
+    state: States
+    dt: float  # ms
+    events: list[pg.Event]
+    checksum: int | None
+
+
+@dataclass
+class Replay:
+    lvl_id: str  # level the game started on
+    lvl_ids: list[str]  # levels of the LevelManager, in order
+    checksum_interval: int
+    frames: list[ReplayFrame]
+
+    @classmethod
+    def load(cls, path: Path) -> "Replay":
+        data = memoryview(path.read_bytes())
+        try:
+            magic, version, checksum_interval, n_lvl_ids = HEADER.unpack_from(data)
+            if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+                raise ReplayReadError(f"{path} is not a version {REPLAY_VERSION} replay")
+            offset = HEADER.size
+
+            lvl_ids: list[str] = []
+            for _ in range(n_lvl_ids):
+                (length,) = LVL_ID.unpack_from(data, offset)
+                offset += LVL_ID.size
+                lvl_ids.append(bytes(data[offset : offset + length]).decode("utf8"))
+                offset += length
+
+            frames: list[ReplayFrame] = []
+            while offset < len(data):
+                state_value, dt, n_events = FRAME.unpack_from(data, offset)
+                offset += FRAME.size
+                events: list[pg.Event] = []
+                for _ in range(n_events):
+                    event_type, key = KEY_EVENT.unpack_from(data, offset)
+                    offset += KEY_EVENT.size
+                    events.append(pg.event.Event(KEY_EVENT_TYPES[event_type], key=key))
+
+                state = States(state_value)
+                checksum = None
+                if has_checksum(len(frames), state, checksum_interval):
+                    (checksum,) = CHECKSUM.unpack_from(data, offset)
+                    offset += CHECKSUM.size
+                frames.append(ReplayFrame(state, dt, events, checksum))
+        except ReplayReadError:
+            raise
+        except (struct.error, IndexError, ValueError) as e:
+            raise ReplayReadError(f"Could not read replay {path}: {e}") from e
+
+        if not lvl_ids:
+            raise ReplayReadError(f"Replay {path} has no level")
+        return cls(lvl_ids[0], lvl_ids[1:], checksum_interval, frames)
+
+
+class InputRecorder:
+    """Writes the input of every iteration of the main loop to a replay file.
+
+    Call record at the start of an iteration, before the state of the game is acted on.
+    """
+
+    def __init__(
+        self, path: Path, lvl_id: str, lvl_ids: list[str], checksum_interval: int = REPLAY_CHECKSUM_INTERVAL
+    ) -> None:
+        self.checksum_interval: int = checksum_interval
+        self.frame: int = 0
+        self.file: BinaryIO | None = path.open("wb")
+
+        self.file.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, checksum_interval, 1 + len(lvl_ids)))
+        for id_ in [lvl_id, *lvl_ids]:
+            encoded = id_.encode("utf8")
+            self.file.write(LVL_ID.pack(len(encoded)) + encoded)
+
+    def record(self, game: "Game", dt: float, events: Sequence[pg.Event]) -> None:
+        if self.file is None:
+            return
+        key_events = [event for event in events if event.type in KEY_EVENT_TYPES and "key" in event.dict]
+
+        record = bytearray(FRAME.pack(game.state.value, dt, len(key_events)))
+        for event in key_events:
+            record += KEY_EVENT.pack(KEY_EVENT_TYPES.index(event.type), event.key)
+        if has_checksum(self.frame, game.state, self.checksum_interval):
+            record += CHECKSUM.pack(world_checksum(game))
+        self.file.write(record)
+        self.frame += 1
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def run_replay(game: "Game", replay: Replay) -> int:
+    """Feeds the recorded frames to game, checking the world against the recorded checksums.
+
+    Returns:
+        int: Number of frames replayed.
+
+    Raises:
+        ReplayDesyncError: The game did not end up in the recorded state.
+    """
+    for i, frame in enumerate(replay.frames):
+        # Exiting can come from a window event that is not recorded
+        if game.state != frame.state and frame.state != States.EXITING:
+            raise ReplayDesyncError(f"Frame {i}: game is {game.state.name}, recorded {frame.state.name}")
+        if frame.checksum is not None and world_checksum(game) != frame.checksum:
+            raise ReplayDesyncError(f"Frame {i}: world checksum differs from the recorded one")
+
+        match frame.state:
+            case States.GAME_RUNNING:
+                game.game_loop_logic(frame.dt, frame.events)
+            case States.GAME_PAUSED:
+                game.paused_loop_logic(frame.events)
+            case States.RESTART:
+                game.restart()
+            case States.EXITING:
+                return i
+
+    return len(replay.frames)
@@ -0,0 +1,219 @@
+"""History of the last frames of a level, to step a Game backwards and forwards.
+
+Every frame is recorded as a FrameDelta holding the position and velocity of the balls and the paddle, the score and
+the bricks whose health, collision sides or alive flag changed during the frame. Every REWIND_KEYFRAME_INTERVAL frames
+the delta holds every brick instead, a keyframe. Going to a frame applies the keyframe before it and then the deltas up
+to the frame, the world is not simulated again.
+"""
+
+import sys
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from itertools import chain
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pygame as pg
+
+import globals
+from constants import REWIND_KEYFRAME_INTERVAL, REWIND_MEMORY_BUDGET
+from entities import BallTrailComponent, Brick
+
+if TYPE_CHECKING:
+    from main import Game
+
+BRICK_STATE_DTYPE = np.dtype([("id", np.int32), ("health", np.int32), ("side_mask", np.uint8), ("alive", np.bool_)])
+NO_BRICKS = np.zeros(0, dtype=np.int32)
+
+
+@dataclass
+class FrameDelta:
+    frame: int
+    bricks: np.ndarray  # BRICK_STATE_DTYPE rows of the changed bricks, or of every brick in a keyframe
+    moving: np.ndarray  # x, y, vel x, vel y of the balls then the paddle
+    score: int
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.bricks) + sys.getsizeof(self.moving)
+
+
+def brick_states(game: "Game", ids: np.ndarray) -> np.ndarray:
+    store = game.brick_store
+    states = np.empty(len(ids), dtype=BRICK_STATE_DTYPE)
+    states["id"] = ids
+    states["health"] = store.health[ids]
+    states["side_mask"] = store.side_mask[ids]
+    states["alive"] = store.alive[ids]
+    return states
+
+
+def moving_states(game: "Game") -> np.ndarray:
+    return np.array(
+        [(*entity.rect.topleft, *entity.vel) for entity in chain(game.balls, game.entities.paddles)], dtype=np.float64
+    )
+
+
+class RewindBuffer:
+    """Frames of the current level recorded within a memory budget, grouped by keyframe.
+
+    Call reset when a level starts and record after every simulated frame. Recording after going back drops the
+    frames that were ahead, the history then continues from the current frame. A disabled buffer records nothing and
+    can not be seeked.
+    """
+
+    def __init__(
+        self,
+        budget: int = REWIND_MEMORY_BUDGET,
+        keyframe_interval: int = REWIND_KEYFRAME_INTERVAL,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled: bool = enabled
+        self.budget: int = budget
+        self.keyframe_interval: int = keyframe_interval
+        self.segments: deque[list[FrameDelta]] = deque()  # each starts with a keyframe
+        self.keyframes: deque[int] = deque()  # frame of the keyframe of each segment
+        self.nbytes: int = 0
+        self.frame: int = 0  # frame the world is at
+        self.head: int = 0  # last recorded frame
+
+    @property
+    def first(self) -> int:
+        return self.keyframes[0] if self.keyframes else 0
+
+    def reset(self, game: "Game") -> None:
+        if not self.enabled:
+            return
+        self.segments.clear()
+        self.keyframes.clear()
+        self.nbytes = 0
+        self.frame = self.head = 0
+        self.append(self.keyframe(game))
+
+    def keyframe(self, game: "Game") -> FrameDelta:
+        game.brick_store.changed.clear()
+        ids = np.arange(len(game.brick_store.bricks), dtype=np.int32)
+        return FrameDelta(self.frame, brick_states(game, ids), moving_states(game), globals.score)
+
+    def delta(self, game: "Game") -> FrameDelta:
+        changed = game.brick_store.changed
+        ids = np.unique(np.array(changed, dtype=np.int32)) if changed else NO_BRICKS
+        changed.clear()
+        return FrameDelta(self.frame, brick_states(game, ids), moving_states(game), globals.score)
+
+    def append(self, delta: FrameDelta) -> None:
+        if delta.frame % self.keyframe_interval == 0 or not self.segments:
+            self.segments.append([delta])
+            self.keyframes.append(delta.frame)
+        else:
+            self.segments[-1].append(delta)
+        self.nbytes += delta.nbytes
+
+        # Always keep the segment being recorded
+        while self.nbytes > self.budget and len(self.segments) > 1:
+            self.nbytes -= sum(d.nbytes for d in self.segments.popleft())
+            self.keyframes.popleft()
+
+    def truncate(self) -> None:
+        """Drops the frames after the current one"""
+        while self.keyframes[-1] > self.frame:
+            self.nbytes -= sum(d.nbytes for d in self.segments.pop())
+            self.keyframes.pop()
+        segment = self.segments[-1]
+        while segment[-1].frame > self.frame:
+            self.nbytes -= segment.pop().nbytes
+        self.head = self.frame
+
+    def record(self, game: "Game") -> None:
+        if not self.enabled:
+            game.brick_store.changed.clear()
+            return
+        if self.frame < self.head:
+            self.truncate()
+        self.frame += 1
+        self.head = self.frame
+        if self.frame % self.keyframe_interval == 0:
+            self.append(self.keyframe(game))
+        else:
+            self.append(self.delta(game))
+
+    def seek(self, game: "Game", frame: int) -> int:
+        """Puts the world back to frame, clamped to the recorded frames
+
+        Returns:
+            int: The frame the world is at.
+        """
+        if not self.enabled:
+            return self.frame
+        frame = min(max(frame, self.first), self.head)
+        i = bisect_right(self.keyframes, frame) - 1
+        segment = self.segments[i]
+        if self.keyframes[i] <= self.frame <= frame:
+            # Forward in the same segment, the deltas up to the current frame are already applied
+            deltas = segment[self.frame - self.keyframes[i] + 1 : frame - self.keyframes[i] + 1]
+        else:
+            deltas = segment[: frame - self.keyframes[i] + 1]
+
+        for delta in deltas:
+            apply_delta(game, delta)
+        if deltas:
+            for entity in chain(game.balls, game.entities.paddles):
+                for component in entity.components:
+                    if isinstance(component, BallTrailComponent):
+                        component.clear()
+
+        # Applying the deltas is not a change of the current frame
+        game.brick_store.changed.clear()
+        self.frame = frame
+        return frame
+
+    def step(self, game: "Game", n: int) -> int:
+        return self.seek(game, self.frame + n)
+
+
+def apply_delta(game: "Game", delta: FrameDelta) -> None:
+    """Sets the bricks, balls, paddle and score of the game to the state recorded in delta"""
+    store = game.brick_store
+    states = delta.bricks
+    ids = states["id"]
+    differs = (
+        (store.health[ids] != states["health"])
+        | (store.side_mask[ids] != states["side_mask"])
+        | (store.alive[ids] != states["alive"])
+    )
+
+    bricks: list[Brick] = []
+    for brick_id, alive in zip(ids[differs].tolist(), states["alive"][differs].tolist()):
+        brick = store.bricks[brick_id]
+        bricks.append(brick)
+        if alive and not store.alive[brick_id]:
+            game.add_entity(brick)
+            store.revive(brick)
+            brick.to_be_deleted_flag = False
+        elif not alive and store.alive[brick_id]:
+            game.remove_entity(brick)
+            store.remove(brick)
+            brick.to_be_deleted_flag = True
+
+    store.health[ids] = states["health"]
+    store.side_mask[ids] = states["side_mask"]
+    for brick in bricks:
+        brick.enabled_collision_sides = int(store.side_mask[brick.store_id])
+    game.brick_layer.update(bricks)
+
+    # Balls added or lost since the delta was recorded, e.g. by a multi ball setup, are removed or added again
+    n_balls = len(delta.moving) - len(game.entities.paddles)
+    if len(game.balls) != n_balls:
+        while len(game.balls) > n_balls:
+            game.remove_entity(game.balls[-1])
+        while len(game.balls) < n_balls:
+            game.add_ball(pg.Vector2(0, -1))
+        if game.balls:
+            game.ball = game.balls[0]
+
+    for entity, (x, y, vx, vy) in zip(chain(game.balls, game.entities.paddles), delta.moving.tolist(), strict=True):
+        entity.rect.topleft = (int(x), int(y))
+        entity.prev_pos.update(x, y)
+        entity.vel.update(vx, vy)
+    globals.score = delta.score
@@ -0,0 +1,19 @@
+# headless must be imported before constants
+import headless
+
+# isort: split
+import pygame as pg
+
+from main import Game
+
+
+def test_restart_drops_pending_time_and_input() -> None:
+    game = Game("lvl1.txt")
+    paddle_start = game.paddle.rect.copy()
+    # Less than a step, kept with the key press for the next call
+    assert game.simulate(headless.FIXED_DT / 2, [pg.Event(pg.KEYDOWN, key=pg.K_LEFT)]) == 0
+
+    game.restart()
+
+    assert game.simulate(headless.FIXED_DT / 2, []) == 0
+    assert game.paddle.rect == paddle_start
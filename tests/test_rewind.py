@@ -0,0 +1,49 @@
+# headless must be imported before constants
+import headless
+
+# isort: split
+import numpy as np
+import pygame as pg
+
+from main import Game
+from rewind import moving_states
+
+
+def play(game: Game, n_frames: int) -> list[np.ndarray]:
+    states = []
+    for _ in range(n_frames):
+        game.game_loop_logic(headless.FIXED_DT, [])
+        states.append(moving_states(game))
+    return states
+
+
+def test_seek_across_added_balls() -> None:
+    game = Game("lvl1.txt")
+    start = moving_states(game)
+    # Balls added after the first keyframe was recorded, like a multi ball setup
+    for angle in (-30, 0, 30):
+        game.add_ball(pg.Vector2(0, -1).rotate(angle))
+    states = play(game, 90)
+
+    assert game.rewind.seek(game, 0) == 0
+    assert len(game.balls) == 1
+    np.testing.assert_array_equal(moving_states(game), start)
+
+    for frame in (1, 45, 90):
+        assert game.rewind.seek(game, frame) == frame
+        assert len(game.balls) == 4
+        np.testing.assert_array_equal(moving_states(game), states[frame - 1])
+
+
+def test_seek_across_removed_balls() -> None:
+    game = Game("lvl1.txt")
+    game.add_ball(pg.Vector2(1, -1))
+    game.rewind.reset(game)
+    states = play(game, 30)
+    game.remove_entity(game.balls[-1])
+    play(game, 30)
+
+    assert game.rewind.seek(game, 20) == 20
+    assert len(game.balls) == 2
+    assert game.ball is game.balls[0]
+    np.testing.assert_array_equal(moving_states(game), states[19])